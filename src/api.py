@@ -1,12 +1,19 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 import docker
+from docker.errors import NotFound
+from docker.utils import version_lt
 
-from metrics import Histogram
+from metrics import Counter, Histogram
 from models import ContainerInfo, ServiceInfo, NodeInfo
 from resources import ContainerList, ServiceList, ResourceList
-from utils import EnhancedDict, Lazy
+from utils import EnhancedDict, Lazy, DependencyTracker, get_logger
 
+logger = get_logger('pygen-api')
 
 # metrics
 containers_histogram = Histogram(
@@ -17,55 +24,405 @@ services_histogram = Histogram(
     'pygen_api_services_seconds', 'API call metrics for listing services',
     labelnames=('desired_state',)
 )
+tasks_histogram = Histogram(
+    'pygen_api_tasks_seconds', 'API call metrics for listing Swarm tasks of services',
+    labelnames=('desired_state',)
+)
 nodes_histogram = Histogram(
     'pygen_api_nodes_seconds', 'API call metrics for listing Swarm nodes'
 )
+state_cache_rebuild_counter = Counter(
+    'pygen_state_cache_rebuilds', 'Number of full state cache rebuilds',
+    labelnames=('resource', 'reason')
+)
+state_cache_event_counter = Counter(
+    'pygen_state_cache_events', 'Number of Docker events applied to the state cache',
+    labelnames=('type',)
+)
+
+
+class StateCache(object):
+    CONTAINER_EVENTS = ('start', 'restart', 'stop', 'die', 'pause', 'unpause',
+                        'destroy', 'rename', 'update', 'health_status')
+    SERVICE_EVENTS = ('create', 'update', 'remove')
+
+    EMPTY_DICT = dict()
+
+    def __init__(self, api, resync_interval=60):
+        self.api = api
+        self.resync_interval = resync_interval
+        self.lock = threading.RLock()
+
+        self._containers = None
+        self._services = None
+        self._last_verified = 0
+        self._last_event_time = None
+
+    def event_filters(self, filters):
+        # the cache has to see every container and service change
+        # even if they would not trigger an update on their own
+        filters = dict(filters)
+
+        if 'event' in filters:
+            filters['event'] = list(filters['event']) + [
+                event for event in self.CONTAINER_EVENTS + self.SERVICE_EVENTS if event not in filters['event']
+            ]
+
+        if 'type' in filters:
+            filters['type'] = list(filters['type']) + [
+                event_type for event_type in ('container', 'service') if event_type not in filters['type']
+            ]
+
+        filters.pop('label', None)
+
+        return filters
+
+    def containers(self):
+        with self.lock:
+            self._verify()
+
+            if self._containers is None:
+                self._rebuild_containers('initial')
+
+            return ContainerList(self._containers.values())
+
+    def services(self):
+        with self.lock:
+            self._verify()
+
+            if self._services is None:
+                self._rebuild_services('initial')
+
+            return ServiceList(self._services.values())
+
+    def invalidate(self, containers=True, services=True):
+        with self.lock:
+            if containers:
+                self._containers = None
+
+            if services:
+                self._services = None
+
+    @property
+    def resume_time(self):
+        return self._last_event_time
+
+    def apply(self, event):
+        event_type = event.get('Type', 'container')
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        actor = event.get('Actor', self.EMPTY_DICT)
+        actor_id = actor.get('ID') or event.get('id')
+
+        if not actor_id:
+            return
+
+        with self.lock:
+            if event.get('time'):
+                self._last_event_time = event['time']
+
+            if event_type == 'container' and action in self.CONTAINER_EVENTS:
+                state_cache_event_counter.labels(event_type).inc()
+
+                self._refresh_container(actor_id)
+
+                service_id = actor.get('Attributes', self.EMPTY_DICT).get('com.docker.swarm.service.id')
+
+                if service_id:
+                    self._refresh_service(service_id)
+
+            elif event_type == 'service' and action in self.SERVICE_EVENTS:
+                state_cache_event_counter.labels(event_type).inc()
+
+                self._refresh_service(actor_id)
+
+    def _refresh_container(self, container_id):
+        if self._containers is None:
+            return
+
+        try:
+            container = self.api.client.containers.get(container_id)
+
+        except NotFound:
+            container = None
+
+        if container and container.attrs['State'].get('Running'):
+            logger.debug('Updating container %s in the state cache', container.name)
+
+            self._containers[container.id] = self.api.container_model(container)
+
+        elif self._containers.pop(container_id, None):
+            logger.debug('Removed container %s from the state cache', container_id)
+
+    def _refresh_service(self, service_id):
+        if self._services is None:
+            return
+
+        try:
+            service = self.api.client.services.get(service_id)
+
+        except NotFound:
+            service = None
+
+        if service:
+            logger.debug('Updating service %s in the state cache', service.name)
+
+            self._services[service.id] = self.api.service_model(service)
+
+        elif self._services.pop(service_id, None):
+            logger.debug('Removed service %s from the state cache', service_id)
+
+    def _rebuild_containers(self, reason):
+        logger.info('Rebuilding the container state cache (%s)', reason)
+
+        state_cache_rebuild_counter.labels('containers', reason).inc()
+
+        self._containers = OrderedDict((c.id, c) for c in self.api.containers())
+
+        if self._last_event_time is None:
+            self._last_event_time = int(time.time())
+
+    def _rebuild_services(self, reason):
+        logger.info('Rebuilding the service state cache (%s)', reason)
+
+        state_cache_rebuild_counter.labels('services', reason).inc()
+
+        self._services = OrderedDict((s.id, s) for s in self.api.services())
+
+    def _verify(self):
+        if self.resync_interval <= 0 or time.time() - self._last_verified < self.resync_interval:
+            return
+
+        self._last_verified = time.time()
+
+        if self._containers is not None:
+            running_ids = set(c['Id'] for c in self.api.client.api.containers(quiet=True))
+
+            if running_ids != set(self._containers):
+                self._rebuild_containers('drift')
+
+        if self._services is not None:
+            if self.api.is_swarm_mode:
+                # task changes on other nodes do not generate events locally
+                running_tasks = set(t['ID'] for t in self.api.client.api.tasks(filters={'desired-state': 'running'}))
+                cached_tasks = set(t.id for s in self._services.values() for t in s.tasks)
+
+                service_versions = dict((s['ID'], s['Version']['Index']) for s in self.api.client.api.services())
+                cached_versions = dict((s.id, s.version) for s in self._services.values())
+
+                if running_tasks != cached_tasks or service_versions != cached_versions:
+                    self._rebuild_services('drift')
+
+            elif self._services:
+                self._rebuild_services('drift')
 
 
 class DockerApi(object):
-    def __init__(self, address=os.environ.get('DOCKER_ADDRESS')):
+    SWARM_EVENT_TYPES = ('node',)
+    NODE_EVENTS = ('create', 'update', 'remove')
+    HEALTH_STATUSES = ('starting', 'healthy', 'unhealthy')
+
+    def __init__(self, address=os.environ.get('DOCKER_ADDRESS'), state_cache=0, task_workers=0, swarm_mode_ttl=30,
+                 compact_models=False, state_ttl=0):
+        self.address = address
         self.client = docker.DockerClient(address, version='auto')
+        self.task_workers = task_workers
+        self.swarm_mode_ttl = swarm_mode_ttl
+        self.state_ttl = state_ttl
+        self._shared_state = dict()
+        self._task_pool = None
+        self._swarm_mode = None
+        self._swarm_mode_checked_at = 0
+
+        if compact_models:
+            # keeps only the parsed fields, the raw objects are fetched again on demand
+            from compact import CompactContainerInfo, CompactServiceInfo, CompactNodeInfo
+
+            self.container_model, self.service_model, self.node_model = \
+                CompactContainerInfo, CompactServiceInfo, CompactNodeInfo
+
+        else:
+            self.container_model, self.service_model, self.node_model = ContainerInfo, ServiceInfo, NodeInfo
+
+        if state_cache:
+            self.state_cache = StateCache(self, resync_interval=state_cache)
+
+        else:
+            self.state_cache = None
 
     @property
     def is_swarm_mode(self):
-        return len(self.client.swarm.attrs) > 0
+        # every access to client.swarm reloads its attributes from the API
+        if self._swarm_mode is None or time.time() - self._swarm_mode_checked_at > self.swarm_mode_ttl:
+            self._swarm_mode = len(self.client.swarm.attrs) > 0
+            self._swarm_mode_checked_at = time.time()
+
+        return self._swarm_mode
+
+    def invalidate_swarm_mode(self):
+        self._swarm_mode = None
 
     def containers(self, **kwargs):
         with containers_histogram.labels('1' if kwargs.get('all') else '0').time():
-            return ContainerList(ContainerInfo(c) for c in self.client.containers.list(**kwargs))
+            # the list summary is enough for most fields, a full inspect only happens on demand
+            return ContainerList(self.container_model.from_summary(summary, self.inspect_container)
+                                 for summary in self.client.api.containers(**kwargs))
+
+    def inspect_container(self, container_id):
+        return self.client.containers.get(container_id)
 
     def services(self, desired_task_state='running', **kwargs):
         if self.is_swarm_mode:
             with services_histogram.labels(desired_task_state).time():
-                return ServiceList(ServiceInfo(s, desired_task_state=desired_task_state)
-                                   for s in self.client.services.list(**kwargs))
+                services = self.client.services.list(**kwargs)
+
+                with tasks_histogram.labels(desired_task_state).time():
+                    tasks = self._tasks(services, desired_task_state)
+
+                return ServiceList(self.service_model(s, desired_task_state=desired_task_state, raw_tasks=tasks[s.id])
+                                   for s in services)
 
         else:
             return ServiceList()
 
+    def _tasks(self, services, desired_task_state):
+        if self.task_workers > 0:
+            if self._task_pool is None:
+                self._task_pool = ThreadPool(self.task_workers)
+
+            # Service.tasks adds the service ID to the filters it is given
+            return dict(zip((s.id for s in services),
+                            self._task_pool.map(lambda s: s.tasks(filters=ServiceInfo.task_filters(desired_task_state)),
+                                                services)))
+
+        # a single call for all the tasks then group them by service
+        tasks = dict((s.id, list()) for s in services)
+
+        for task in self.client.api.tasks(filters=ServiceInfo.task_filters(desired_task_state)):
+            if task['ServiceID'] in tasks:
+                tasks[task['ServiceID']].append(task)
+
+        return tasks
+
     def nodes(self, **kwargs):
         if self.is_swarm_mode:
             with nodes_histogram.time():
-                return ResourceList(NodeInfo(n) for n in self.client.nodes.list(**kwargs))
+                return ResourceList(self.node_model(n) for n in self.client.nodes.list(**kwargs))
 
         else:
             return ResourceList()
 
     @property
     def state(self):
-        return EnhancedDict(containers=self.containers(),
-                            services=self.services(),
-                            all_containers=Lazy(self.containers, all=True),
-                            all_services=Lazy(self.services, desired_task_state=''),
-                            nodes=Lazy(self.nodes))
+        source = self.state_cache or self
+
+        # nothing is fetched until a template actually uses it
+        return EnhancedDict(containers=Lazy(self._load_state, 'containers', source.containers),
+                            services=Lazy(self._load_state, 'services', source.services),
+                            all_containers=self._lazy_state('all_containers', self.containers, all=True),
+                            all_services=self._lazy_state('all_services', self.services, desired_task_state=''),
+                            nodes=self._lazy_state('nodes', self.nodes))
+
+    def _lazy_state(self, name, delegate, **kwargs):
+        if not self.state_ttl:
+            return Lazy(self._load_state, name, delegate, **kwargs)
+
+        # shared between updates until it expires or a related event arrives
+        return self._shared_state.setdefault(
+            name, Lazy(self._load_state, name, delegate, **kwargs).expire_after(self.state_ttl)
+        )
+
+    def _invalidate_shared_state(self, *names):
+        for name in names:
+            if name in self._shared_state:
+                self._shared_state[name].invalidate()
+
+    @classmethod
+    def _load_state(cls, name, delegate, *args, **kwargs):
+        # lazy values can be loaded while a template is being rendered
+        with DependencyTracker.untracked():
+            return cls._named_state(name, delegate(*args, **kwargs))
+
+    @staticmethod
+    def _named_state(name, resources):
+        if isinstance(resources, ResourceList):
+            resources.state_name = name
+
+        return resources
+
+    def invalidate_services(self):
+        if self.state_cache:
+            self.state_cache.invalidate(containers=False)
+
+        self._invalidate_shared_state('all_services')
 
     def events(self, **kwargs):
-        for event in self.client.events(**kwargs):
+        for event in self.client.events(**self.event_arguments(**kwargs)):
+            if isinstance(event, dict):
+                self.process_event(event)
+
             yield event
 
+    def event_arguments(self, **kwargs):
+        if self.state_cache and 'since' not in kwargs and self.state_cache.resume_time:
+            # replay what we might have missed while the event stream was down
+            kwargs['since'] = self.state_cache.resume_time
+
+        if kwargs.get('filters'):
+            if self.state_cache:
+                kwargs['filters'] = self.state_cache.event_filters(kwargs['filters'])
+
+            kwargs['filters'] = self.event_filters(kwargs['filters'])
+
+        return kwargs
+
+    def event_filters(self, filters):
+        filters = dict(filters)
+
+        # the Swarm mode check and the shared nodes are invalidated by node events,
+        # unless the events are filtered by labels, then they just expire
+        if 'label' not in filters and (self.state_ttl or 'service' in filters.get('type', ['service'])):
+            if 'event' in filters:
+                filters['event'] = list(filters['event']) + [
+                    event for event in self.NODE_EVENTS if event not in filters['event']
+                ]
+
+            if 'type' in filters:
+                filters['type'] = list(filters['type']) + [
+                    event_type for event_type in self.SWARM_EVENT_TYPES if event_type not in filters['type']
+                ]
+
+        if 'health_status' in filters.get('event', ()) and version_lt(self.client.api.api_version, '1.25'):
+            # daemons before 1.13 only match the full action, like health_status: healthy
+            filters['event'] = list(filters['event']) + [
+                'health_status: %s' % status for status in self.HEALTH_STATUSES
+            ]
+
+        return filters
+
+    def process_event(self, event):
+        event_type = event.get('Type', 'container')
+
+        if event_type in self.SWARM_EVENT_TYPES:
+            self.invalidate_swarm_mode()
+
+        if event_type == 'container':
+            self._invalidate_shared_state('all_containers')
+
+        elif event_type == 'service':
+            self._invalidate_shared_state('all_services')
+
+        elif event_type == 'node':
+            self._invalidate_shared_state('nodes')
+
+        if self.state_cache:
+            self.state_cache.apply(event)
+
     def run_action(self, action_type, *args, **kwargs):
         action = action_type(self, swarm_manager=kwargs.get('manager'))
         action.execute(*args)
 
     def close(self):
+        if self._task_pool:
+            self._task_pool.close()
+
         self.client.api.close()
@@ -12,6 +12,59 @@ def parse_arguments(args=sys.argv[1:]):
                         required=False,
                         help='The target to save the generated file (/dev/stdout by default)')
 
+    parser.add_argument('--output',
+                        metavar=('<TEMPLATE>', '<TARGET>'), required=False, nargs='+', action='append', default=list(),
+                        help='Additional template and target pair generated from the same Docker state, '
+                             'optionally followed by its own actions as restart=<CONTAINER> '
+                             'or signal=<CONTAINER>:<SIGNAL>')
+
+    parser.add_argument('--template-cache',
+                        metavar='<DIRECTORY>', required=False,
+                        help='Keep a copy of the templates loaded over HTTP in this directory, '
+                             'used for conditional requests and when the server is unreachable')
+    parser.add_argument('--template-refresh',
+                        metavar='<SECONDS>', required=False, type=float, default=0,
+                        help='Check the templates for changes periodically and regenerate the targets '
+                             'when they have changed (default: 0 meaning never)')
+
+    parser.add_argument('--watch-templates',
+                        required=False, action='store_true',
+                        help='Watch the template files, and the ones they include, for changes '
+                             'and regenerate the affected targets from the last known Docker state')
+
+    parser.add_argument('--bytecode-cache',
+                        metavar='<DIRECTORY>', required=False,
+                        help='Cache the compiled templates in this directory between runs')
+    parser.add_argument('--precompiled',
+                        metavar='<DIRECTORY>', required=False,
+                        help='Load the template files from modules compiled with --precompile '
+                             'in this directory, falling back to the source files')
+    parser.add_argument('--precompile',
+                        metavar='<DIRECTORY>', required=False,
+                        help='Compile the template files and the ones they include into modules '
+                             'in this directory then exit, for use with --precompiled')
+
+    parser.add_argument('--atomic-write',
+                        required=False, action='store_true',
+                        help='Write the target to a temporary file in the same directory first '
+                             'then rename it over the target, so readers never see a partially written file '
+                             '(share the target\'s directory rather than the file itself with other containers)')
+    parser.add_argument('--fsync',
+                        required=False, action='store_true',
+                        help='Flush the target file (and its directory with --atomic-write) '
+                             'to the disk before executing any actions')
+
+    parser.add_argument('--stream',
+                        required=False, action='store_true',
+                        help='Render the template in chunks straight into a temporary file '
+                             'and only swap it in place of the target if the content has changed, '
+                             'instead of generating the whole content in memory first')
+
+    parser.add_argument('--track-dependencies',
+                        required=False, action='store_true',
+                        help='Record which parts of the Docker state the templates use '
+                             'and skip generating them again until those have changed')
+
     parser.add_argument('--restart',
                         metavar='<CONTAINER>', required=False, action='append', default=list(),
                         help='Restart the target container, can be: '
@@ -36,6 +89,34 @@ def parse_arguments(args=sys.argv[1:]):
                         default=['start', 'stop', 'die', 'health_status'],
                         help='Docker events to watch and trigger updates for '
                              '(default: start, stop, die, health_status)')
+    parser.add_argument('--watch-labels',
+                        metavar='<LABEL>', required=False, nargs='+', default=list(),
+                        help='Only watch events from containers having these labels, '
+                             'given as <key> or <key>=<value>. With --state-cache '
+                             'the labels are only checked by the app, not the Docker daemon')
+
+    parser.add_argument('--state-cache',
+                        metavar='<SECONDS>', required=False, nargs='?', const=60, default=0, type=float,
+                        help='Keep the running containers and services in memory and update them '
+                             'from Docker events instead of listing everything again on each event. '
+                             'The cache is verified against the Docker daemon at most every <SECONDS> '
+                             'seconds and rebuilt when it has drifted (default: 60 when enabled)')
+    parser.add_argument('--task-workers',
+                        metavar='<COUNT>', required=False, type=int, default=0,
+                        help='Number of threads fetching the Swarm tasks of services in parallel. '
+                             'Defaults to 0 meaning all tasks are listed with a single API call '
+                             'and grouped by their service')
+
+    parser.add_argument('--state-ttl',
+                        metavar='<SECONDS>', required=False, type=float, default=0,
+                        help='Share the lazily loaded all_containers, all_services and nodes '
+                             'between updates for this many seconds, unless a related event arrives. '
+                             'Defaults to 0 meaning they are loaded again for every update')
+
+    parser.add_argument('--compact-models',
+                        required=False, action='store_true',
+                        help='Keep only the parsed fields of containers, services, tasks and nodes '
+                             'in memory and fetch their raw API objects again when used')
 
     parser.add_argument('--swarm-manager',
                         required=False, action='store_true',
@@ -60,6 +141,11 @@ def parse_arguments(args=sys.argv[1:]):
     parser.add_argument('--docker-address',
                         metavar='<ADDRESS>', required=False,
                         help='Alternative address (URL) for the Docker daemon connection')
+    parser.add_argument('--runtime',
+                        required=False, choices=('threads', 'asyncio'), default='threads',
+                        help='Watch the events and fetch the Docker state on threads or '
+                             'on an asyncio event loop through the Docker unix socket '
+                             '(Python 3.6+ only, default: threads)')
 
     parser.add_argument('--metrics',
                         metavar='<PORT>', required=False, type=int, default=9413,
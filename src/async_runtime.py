@@ -0,0 +1,399 @@
+import asyncio
+import json
+import os
+import time
+
+from docker.utils import convert_filters
+from six.moves.urllib.parse import urlencode
+
+from api import DockerApi
+from errors import PyGenException
+from render_queue import update_request_counter, coalesced_request_counter, queue_lag_histogram
+from resources import ContainerList, ServiceList
+from swarm_worker import send_counter as worker_send_counter
+from timer import ScheduledCall
+from utils import get_logger
+
+logger = get_logger('pygen-async')
+
+
+def unix_socket_path(address):
+    address = address or os.environ.get('DOCKER_ADDRESS') or 'unix:///var/run/docker.sock'
+
+    if not address.startswith('unix://'):
+        raise PyGenException('The asyncio runtime only supports unix socket Docker addresses: %s' % address)
+
+    return address[len('unix://'):]
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+
+    if not status_line:
+        raise PyGenException('Connection closed without a response')
+
+    status = int(status_line.split()[1])
+    headers = dict()
+
+    while True:
+        line = await reader.readline()
+
+        if line in (b'\r\n', b'\n', b''):
+            break
+
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    return status, headers
+
+
+async def read_body(reader, headers):
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+
+            if size == 0:
+                break
+
+            yield await reader.readexactly(size)
+
+            await reader.readline()
+
+    elif 'content-length' in headers:
+        yield await reader.readexactly(int(headers['content-length']))
+
+    else:
+        yield await reader.read()
+
+
+async def http_post(host, port, body=b'', timeout=30):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+
+    try:
+        writer.write(('POST / HTTP/1.1\r\nHost: %s:%d\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' %
+                      (host, port, len(body))).encode('ascii') + body)
+
+        await writer.drain()
+
+        status, headers = await asyncio.wait_for(read_response(reader), timeout)
+
+        content = b''.join([chunk async for chunk in read_body(reader, headers)])
+
+        return status, content.decode('utf-8')
+
+    finally:
+        writer.close()
+
+
+class AsyncDockerClient(object):
+    def __init__(self, socket_path, version):
+        self.socket_path = socket_path
+        self.version = version
+
+    @classmethod
+    def from_api(cls, api):
+        return cls(unix_socket_path(api.address), api.client.api.api_version)
+
+    async def _request(self, path, **params):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+
+        query = '?%s' % urlencode(params) if params else ''
+
+        writer.write(('GET /v%s%s%s HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n\r\n' %
+                      (self.version, path, query)).encode('ascii'))
+
+        await writer.drain()
+
+        status, headers = await read_response(reader)
+
+        return status, headers, reader, writer
+
+    async def get_json(self, path, **params):
+        status, headers, reader, writer = await self._request(path, **params)
+
+        try:
+            content = b''.join([chunk async for chunk in read_body(reader, headers)])
+
+        finally:
+            writer.close()
+
+        if status >= 400:
+            raise PyGenException('Docker API error on %s: HTTP %s : %s' % (path, status, content.decode('utf-8')))
+
+        return json.loads(content.decode('utf-8'))
+
+    async def containers(self, all=False):
+        return await self.get_json('/containers/json', **({'all': 1} if all else dict()))
+
+    async def services(self):
+        return await self.get_json('/services')
+
+    async def tasks(self, filters=None):
+        return await self.get_json('/tasks', **({'filters': convert_filters(filters)} if filters else dict()))
+
+    async def events(self, filters=None, since=None, until=None):
+        params = dict()
+
+        if filters:
+            params['filters'] = convert_filters(filters)
+
+        if since:
+            params['since'] = since
+
+        if until:
+            params['until'] = until
+
+        status, headers, reader, writer = await self._request('/events', **params)
+
+        try:
+            if status >= 400:
+                raise PyGenException('Docker API error on /events: HTTP %s' % status)
+
+            buffered = b''
+
+            # the events are sent as newline separated JSON documents
+            async for chunk in read_body(reader, headers):
+                buffered += chunk
+
+                while b'\n' in buffered:
+                    line, buffered = buffered.split(b'\n', 1)
+
+                    if line.strip():
+                        yield json.loads(line.decode('utf-8'))
+
+        finally:
+            writer.close()
+
+
+class LoopScheduler(object):
+    def __init__(self, loop):
+        self.loop = loop
+
+    def call_later(self, delay, function, name=None):
+        call = ScheduledCall(time.time() + delay, function, name)
+
+        self.loop.call_soon_threadsafe(self.loop.call_later, delay, self._run, call)
+
+        return call
+
+    def _run(self, call):
+        if call.finished.is_set():
+            return
+
+        call.finished.set()
+
+        # the timer functions use the blocking Docker client to run actions
+        self.loop.run_in_executor(None, self._call, call)
+
+    @staticmethod
+    def _call(call):
+        try:
+            call.function()
+
+        except Exception as ex:
+            logger.error('Failed to run the scheduled %s: %s' % (call.name or 'call', ex), exc_info=1)
+
+
+class AsyncRenderQueue(object):
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+        self._pending = 0
+        self._pending_since = None
+        self._allow_repeat = False
+        self._task = None
+
+    @property
+    def is_running(self):
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def request(self, source, allow_repeat=False):
+        update_request_counter.labels(source).inc()
+
+        self.runtime.loop.call_soon_threadsafe(self._request, allow_repeat)
+
+    def _request(self, allow_repeat):
+        if self._pending:
+            coalesced_request_counter.inc()
+
+        else:
+            self._pending_since = time.time()
+
+        self._pending += 1
+        self._allow_repeat = self._allow_repeat or allow_repeat
+
+        if self._task is None:
+            self._task = self.runtime.loop.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self._pending:
+                pending, self._pending = self._pending, 0
+                allow_repeat, self._allow_repeat = self._allow_repeat, False
+
+                queue_lag_histogram.observe(time.time() - self._pending_since)
+
+                if pending > 1:
+                    logger.debug('Handling %d update requests with a single update', pending)
+
+                await self.runtime.update(allow_repeat)
+
+        finally:
+            self._task = None
+
+
+class AsyncRuntime(object):
+    EMPTY_DICT = dict()
+
+    def __init__(self, app, loop=None, client=None):
+        self.app = app
+        self.loop = loop or asyncio.new_event_loop()
+        self.client = client or AsyncDockerClient.from_api(app.api)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+
+        self.app.use_scheduler(LoopScheduler(self.loop))
+        self.app.render_queue = AsyncRenderQueue(self)
+
+        if self.app.one_shot:
+            self.loop.run_until_complete(self.update())
+            return
+
+        self.app.start_watching()
+        self.app.request_update('startup')
+
+        self.loop.run_until_complete(self.watch())
+
+    async def update(self, allow_repeat=False):
+        try:
+            state = await self.fetch_state()
+
+        except Exception as ex:
+            logger.error('Failed to fetch the Docker state: %s' % ex, exc_info=1)
+            return
+
+        self.app.update_target(allow_repeat=allow_repeat, state=state)
+
+    async def fetch_state(self):
+        api = self.app.api
+        state = api.state
+
+        if api.state_cache:
+            return state
+
+        state_variables = self.app.state_variables
+
+        fetches = dict()
+
+        if state_variables is None or 'containers' in state_variables:
+            fetches['containers'] = self.client.containers()
+
+        if state_variables is None or 'services' in state_variables:
+            if await self.loop.run_in_executor(None, lambda: api.is_swarm_mode):
+                fetches['services'] = self.client.services()
+                fetches['tasks'] = self.client.tasks(filters={'desired-state': 'running'})
+
+            else:
+                state['services'] = DockerApi._named_state('services', ServiceList())
+
+        # the lists are fetched concurrently
+        results = dict(zip(fetches.keys(), await asyncio.gather(*fetches.values())))
+
+        if 'containers' in results:
+            state['containers'] = DockerApi._named_state('containers', ContainerList(
+                api.container_model.from_summary(summary, api.inspect_container)
+                for summary in results['containers']
+            ))
+
+        if 'services' in results:
+            tasks = dict()
+
+            for task in results['tasks']:
+                tasks.setdefault(task['ServiceID'], list()).append(task)
+
+            state['services'] = DockerApi._named_state('services', ServiceList(
+                api.service_model(api.client.services.prepare_model(service),
+                                  desired_task_state='running', raw_tasks=tasks.get(service['ID'], list()))
+                for service in results['services']
+            ))
+
+        return state
+
+    async def watch(self, **kwargs):
+        api = self.app.api
+
+        kwargs.setdefault('filters', self.app.event_matcher.filters)
+
+        async for event in self.client.events(**api.event_arguments(**kwargs)):
+            api.process_event(event)
+
+            if self.app.is_watched(event):
+                logger.info('Received %s event from %s',
+                            event.get('status'),
+                            event.get('Actor', self.EMPTY_DICT).get('Attributes', self.EMPTY_DICT).get('name', '<?>'))
+
+                self.app.request_update('event', allow_repeat=True)
+
+
+class AsyncWorkerRuntime(object):
+    EMPTY_DICT = dict()
+
+    def __init__(self, worker, loop=None, client=None):
+        self.worker = worker
+        self.loop = loop or asyncio.new_event_loop()
+        self.client = client or AsyncDockerClient.from_api(worker.api)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+
+        self.loop.run_until_complete(self.watch())
+
+    async def watch(self):
+        api = self.worker.api
+
+        async for event in self.client.events(**api.event_arguments(filters=self.worker.event_matcher.filters)):
+            api.process_event(event)
+
+            if self.worker.is_watched(event):
+                logger.info('Received %s event from %s',
+                            event.get('status'),
+                            event.get('Actor', self.EMPTY_DICT).get('Attributes', self.EMPTY_DICT).get('name', '<?>'))
+
+                await self.send_update(event.get('status'))
+
+    async def send_update(self, status):
+        # the managers are notified concurrently
+        await asyncio.gather(*(self._send_update(manager, status) for manager in self.worker.managers))
+
+    async def _send_update(self, manager, status):
+        port = self.worker.manager_port
+
+        for attempt in range(self.worker.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.worker.retry_delay * 2 ** (attempt - 1))
+
+            try:
+                response_status, response = await http_post(manager, port)
+
+                if response_status == 200:
+                    logger.info('Update (%s) sent to http://%s:%d/ : HTTP %s : %s',
+                                status, manager, port, response_status, response.strip())
+
+                    worker_send_counter.labels(manager).inc()
+
+                    break
+
+                else:
+                    logger.error('Failed to send update to http://%s:%d/ : HTTP %s : %s',
+                                 manager, port, response_status, response.strip())
+
+            except Exception as ex:
+                logger.error('Failed to send update to http://%s:%d/: %s', manager, port, ex, exc_info=1)
+
@@ -1,5 +1,9 @@
+import sys
+
 from arguments import parse_arguments
+from errors import PyGenException
 from pygen import PyGen
+from templates import precompile_templates
 from utils import get_logger, set_log_level, setup_signals
 
 logger = get_logger('pygen-cli')
@@ -15,6 +19,13 @@ def main():  # pragma: no cover
 
     logger.debug('Startup arguments: %s', ', '.join('%s=%s' % item for item in kwargs.items()))
 
+    if kwargs.get('runtime') == 'asyncio' and sys.version_info < (3, 6):
+        raise PyGenException('The asyncio runtime needs Python 3.6 or newer')
+
+    if kwargs.get('precompile'):
+        precompile_templates(kwargs['precompile'], kwargs['template'], *(output[0] for output in kwargs['output']))
+        return
+
     app = PyGen(**kwargs)
 
     setup_signals(app)
@@ -22,6 +33,15 @@ def main():  # pragma: no cover
     logger.debug('Signal handlers set up for SIGTERM, SIGINT and SIGHUP')
 
     try:
+        if kwargs.get('runtime') == 'asyncio':
+            from async_runtime import AsyncRuntime
+
+            logger.debug('Starting the asyncio runtime')
+
+            AsyncRuntime(app).run()
+
+            return
+
         app.update_target()
 
         logger.debug('Starting event watch loop')
@@ -0,0 +1,251 @@
+from functools import partial
+
+from six.moves import intern
+
+from models import ContainerInfo, SparseContainerInfo, TaskInfo, ServiceInfo, NodeInfo
+from resources import TaskList
+from utils import EnhancedDict, TrackedRecord, DependencyTracker
+
+
+def _intern(value):
+    # only native strings can be interned on Python 2
+    if isinstance(value, str):
+        return intern(value)
+
+    return value
+
+
+class FrozenDict(EnhancedDict):
+    def __init__(self, values=None, default=None):
+        super(FrozenDict, self).__init__(
+            (_intern(key), _intern(value)) for key, value in (values or dict()).items()
+        )
+
+        self.default_value = default
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('%s is read-only' % type(self).__name__)
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def default(self, value):
+        if value == self.default_value:
+            return self
+
+        return FrozenDict(self, default=value)
+
+
+_empty_maps = dict()
+
+
+def frozen_map(values, default=None):
+    if values:
+        return FrozenDict(values, default=default)
+
+    if default not in _empty_maps:
+        _empty_maps[default] = FrozenDict(default=default)
+
+    return _empty_maps[default]
+
+
+def compact_value(value):
+    if isinstance(value, EnhancedDict) and not isinstance(value, FrozenDict):
+        return frozen_map(value, default=value.default_value)
+
+    return _intern(value)
+
+
+class CompactRecord(TrackedRecord):
+    __slots__ = ('_values', '_raw', '_raw_loader')
+
+    fields = ()
+    lazy_fields = ()
+
+    _unloaded = object()
+
+    def _assign(self, model, raw_loader):
+        self._values = tuple(self._unloaded if field in self.lazy_fields and not dict.__contains__(model, field)
+                             else compact_value(dict.get(model, field))
+                             for field in self.fields)
+        self._raw = None
+        self._raw_loader = raw_loader
+
+    @classmethod
+    def from_model(cls, model, raw_loader=None):
+        record = cls.__new__(cls)
+        record._assign(model, raw_loader)
+        return record
+
+    @classmethod
+    def _positions(cls):
+        if '_field_positions' not in cls.__dict__:
+            cls._field_positions = dict((field, idx) for idx, field in enumerate(cls.fields))
+            cls._lowercase_fields = dict((field.lower(), field) for field in cls.fields)
+
+        return cls._field_positions
+
+    @property
+    def raw(self):
+        if self._raw is None and self._raw_loader:
+            self._raw = self._raw_loader()
+
+        return self._raw
+
+    def _value(self, field):
+        value = self._values[self._positions()[field]]
+
+        if value is self._unloaded:
+            # only the records with lazy fields have to build their model from the raw object
+            model = self.model_from_raw(self.raw)
+            values = list(self._values)
+
+            for lazy_field in self.lazy_fields:
+                values[self._positions()[lazy_field]] = compact_value(dict.get(model, lazy_field))
+
+            self._values = tuple(values)
+
+            value = self._values[self._positions()[field]]
+
+        return value
+
+    def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
+
+        positions = self._positions()
+
+        if item not in positions:
+            item = self._lowercase_fields.get(item.lower())
+
+            if item is None:
+                return None
+
+        return self._tracked(item, self._value(item))
+
+    def __getitem__(self, item):
+        if item == 'raw':
+            return self.raw
+
+        positions = self._positions()
+
+        if item not in positions:
+            raise KeyError(item)
+
+        return self._tracked(item, self._value(item))
+
+    def _tracked(self, item, value):
+        tracker = DependencyTracker.current()
+
+        if tracker:
+            tracker.record_attribute(self, item, value)
+
+        return value
+
+    def get(self, item, default=None):
+        if item in self:
+            return self[item]
+
+        return default
+
+    def __contains__(self, item):
+        return item == 'raw' or item in self._positions()
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def keys(self):
+        return list(self.fields)
+
+    def values(self):
+        return [self[field] for field in self.fields]
+
+    def items(self):
+        return [(field, self[field]) for field in self.fields]
+
+    def record_id(self):
+        return self._values[self._positions()['id']]
+
+    def record_items(self):
+        return [(field, value) for field, value in zip(self.fields, self._values) if value is not self._unloaded]
+
+    def record_value(self, attribute):
+        positions = self._positions()
+
+        if attribute not in positions:
+            attribute = self._lowercase_fields.get(attribute.lower())
+
+            if attribute is None:
+                return None
+
+        return self._value(attribute)
+
+    def __hash__(self):
+        return hash(self.record_id())
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % item for item in self.record_items()))
+
+
+class CompactContainerInfo(CompactRecord):
+    __slots__ = ()
+
+    fields = ('id', 'short_id', 'name', 'image', 'status', 'health', 'labels', 'env', 'networks', 'ports')
+
+    lazy_fields = ('env', 'image')
+
+    def __init__(self, container, **kwargs):
+        self._assign(ContainerInfo(container, **kwargs), partial(container.collection.get, container.id))
+
+    @classmethod
+    def from_summary(cls, summary, inspect, **kwargs):
+        return cls.from_model(SparseContainerInfo(summary, inspect, **kwargs), partial(inspect, summary['Id']))
+
+    @classmethod
+    def model_from_raw(cls, raw):
+        return ContainerInfo(raw)
+
+
+class CompactTaskInfo(CompactRecord):
+    __slots__ = ()
+
+    fields = ('id', 'name', 'node_id', 'service_id', 'slot', 'container_id', 'image', 'status',
+              'desired_state', 'labels', 'env', 'networks')
+
+    def __init__(self, service, task, **kwargs):
+        self._assign(TaskInfo(service, task, **kwargs), partial(service.client.api.inspect_task, task['ID']))
+
+
+class CompactServiceInfo(CompactRecord):
+    __slots__ = ()
+
+    fields = ('id', 'short_id', 'name', 'version', 'image', 'labels', 'ports', 'networks', 'ingress', 'tasks')
+
+    def __init__(self, service, **kwargs):
+        model = ServiceInfo(service, **kwargs)
+
+        dict.__setitem__(model, 'tasks', TaskList(
+            CompactTaskInfo.from_model(task, partial(service.client.api.inspect_task, dict.get(task, 'id')))
+            for task in dict.get(model, 'tasks')
+        ))
+
+        self._assign(model, partial(service.collection.get, service.id))
+
+
+class CompactNodeInfo(CompactRecord):
+    __slots__ = ()
+
+    fields = ('id', 'short_id', 'name', 'version', 'state', 'address', 'hostname', 'role', 'availability',
+              'labels', 'platform', 'engine_version')
+
+    def __init__(self, node, **kwargs):
+        self._assign(NodeInfo(node, **kwargs), partial(node.collection.get, node.id))
@@ -0,0 +1,71 @@
+import re
+
+
+class EventMatcher(object):
+    EMPTY_DICT = dict()
+
+    TYPE_ACTIONS = {
+        'container': ('attach', 'commit', 'copy', 'create', 'destroy', 'detach', 'die', 'exec_create',
+                      'exec_detach', 'exec_die', 'exec_start', 'export', 'health_status', 'kill', 'oom',
+                      'pause', 'rename', 'resize', 'restart', 'start', 'stop', 'top', 'unpause', 'update'),
+        'service': ('create', 'update', 'remove')
+    }
+
+    def __init__(self, events, types=None, labels=None):
+        self.events = list(events or list())
+        self.types = list(types or list())
+        self.labels = list(labels or list())
+
+        if self.types and not all(self._has_type_action(event) for event in self.events):
+            # events of other types, like network connect, are watched from any type then
+            self.types = list()
+
+        # health_status comes as 'health_status: healthy' for example
+        self._pattern = re.compile(r'^(?:%s)(?::.+)?$' % '|'.join(re.escape(event) for event in self.events))
+
+        self._label_filters = list(self._split_label(label) for label in self.labels)
+
+    def _has_type_action(self, event):
+        return any(event in self.TYPE_ACTIONS.get(event_type, ()) for event_type in self.types)
+
+    @staticmethod
+    def _split_label(label):
+        if '=' in label:
+            return tuple(label.split('=', 1))
+
+        else:
+            return label, None
+
+    def matches(self, event):
+        if self.events and not self._pattern.match(event.get('Action') or event.get('status') or ''):
+            return False
+
+        if self.types and event.get('Type', 'container') not in self.types:
+            return False
+
+        if self._label_filters:
+            attributes = event.get('Actor', self.EMPTY_DICT).get('Attributes', self.EMPTY_DICT)
+
+            for key, value in self._label_filters:
+                if key not in attributes:
+                    return False
+
+                if value is not None and attributes[key] != value:
+                    return False
+
+        return True
+
+    @property
+    def filters(self):
+        filters = dict()
+
+        if self.events:
+            filters['event'] = list(self.events)
+
+        if self.types:
+            filters['type'] = list(self.types)
+
+        if self.labels:
+            filters['label'] = list(self.labels)
+
+        return filters
@@ -22,6 +22,9 @@ class Manager(HttpServer):
     manager_port = 9411
     worker_port = 9412
 
+    # keeps the connections to the workers alive between actions
+    _session = requests.Session()
+
     def __init__(self, app, workers, retries=0):
         super(Manager, self).__init__(self.manager_port)
 
@@ -32,7 +35,10 @@ class Manager(HttpServer):
     def _handle_request(self, request):
         request_counter.labels(request.address_string()).inc()
 
-        self.app.update_target(allow_repeat=True)
+        # events from other nodes are not visible on the local event stream
+        self.app.api.invalidate_services()
+
+        self.app.request_update('manager', allow_repeat=True)
 
     def send_action(self, name, *args):
         logger.debug('Sending %s action to workers: %s', name, ', '.join(self.workers))
@@ -79,8 +85,8 @@ class Manager(HttpServer):
                 logger.error('Failed to send %s action to http://%s:%d/ : %s',
                              name, worker, self.worker_port, ex, exc_info=1)
 
-    @staticmethod
-    def _send_action_request(address, port, data):
-        response = requests.post('http://%s:%d/' % (address, port), json=data, timeout=(5, 30))
+    @classmethod
+    def _send_action_request(cls, address, port, data):
+        response = cls._session.post('http://%s:%d/' % (address, port), json=data, timeout=(5, 30))
 
         return response.status_code, response.text.strip()
@@ -1,16 +1,203 @@
+import select
+import socket
 import threading
 import time
 
 import six
-from six.moves import BaseHTTPServer, socketserver
+from prometheus_client import Counter, Gauge
+from six.moves import BaseHTTPServer, queue
 
 from errors import PyGenException
 from utils import get_logger
 
 logger = get_logger('pygen-http-server')
 
+# metrics
+queue_depth_gauge = Gauge(
+    'pygen_http_queue_depth', 'Number of connections waiting for an HTTP worker thread',
+    labelnames=('port',)
+)
+active_requests_gauge = Gauge(
+    'pygen_http_active_connections', 'Number of connections being handled by the HTTP worker threads',
+    labelnames=('port',)
+)
+idle_connections_gauge = Gauge(
+    'pygen_http_idle_connections', 'Number of keep-alive connections waiting for their next request',
+    labelnames=('port',)
+)
+rejected_counter = Counter(
+    'pygen_http_rejected_count', 'Number of connections rejected because the HTTP request queue was full',
+    labelnames=('port',)
+)
+
+
+class PooledHTTPServer(BaseHTTPServer.HTTPServer):
+    REJECT_RESPONSE = six.b('HTTP/1.1 503 Service Unavailable\r\n'
+                            'Content-Length: 0\r\n'
+                            'Connection: close\r\n\r\n')
+
+    def __init__(self, server_address, request_handler, pool_size, queue_size, keep_alive_timeout):
+        # HTTPServer is an old-style class on Python 2
+        BaseHTTPServer.HTTPServer.__init__(self, server_address, request_handler)
+
+        self.port_label = str(self.server_address[1])
+        self.keep_alive_timeout = keep_alive_timeout
+        self.pending = queue.Queue(queue_size)
+        self.connections = set()
+        self.idle_connections = dict()
+        self.connections_lock = threading.Lock()
+        self.closed = False
+
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+
+        self.workers = [threading.Thread(target=self._work, name='http-%s-%d' % (self.port_label, idx))
+                        for idx in range(pool_size)]
+        self.workers.append(threading.Thread(target=self._watch_idle_connections,
+                                             name='http-%s-idle' % self.port_label))
+
+        for worker in self.workers:
+            worker.daemon = True
+            worker.start()
+
+    def process_request(self, request, client_address):
+        try:
+            self.pending.put_nowait((request, client_address))
+
+        except queue.Full:
+            logger.warning('Rejecting connection from %s, the request queue is full', client_address[0])
+
+            rejected_counter.labels(self.port_label).inc()
+
+            self._reject(request)
+
+            return
+
+        queue_depth_gauge.labels(self.port_label).set(self.pending.qsize())
+
+    def finish_request(self, request, client_address):
+        handler = self.RequestHandlerClass(request, client_address, self)
+
+        return not getattr(handler, 'close_connection', True)
+
+    def _reject(self, request):
+        try:
+            request.sendall(self.REJECT_RESPONSE)
+
+        except socket.error:
+            pass
+
+        self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self.pending.get()
+
+            if item is None:
+                return
+
+            queue_depth_gauge.labels(self.port_label).set(self.pending.qsize())
+            active_requests_gauge.labels(self.port_label).inc()
+
+            request, client_address = item
+            keep_alive = False
+
+            with self.connections_lock:
+                self.connections.add(request)
+
+            try:
+                keep_alive = self.finish_request(request, client_address)
+
+            except Exception:
+                self.handle_error(request, client_address)
+
+            finally:
+                with self.connections_lock:
+                    self.connections.discard(request)
+
+                    if keep_alive and not self.closed:
+                        # waits for the next request without holding a worker thread
+                        self.idle_connections[request] = (client_address, time.time())
+
+                    else:
+                        keep_alive = False
+
+                if keep_alive:
+                    self._wakeup()
+
+                else:
+                    self.shutdown_request(request)
+
+                active_requests_gauge.labels(self.port_label).dec()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_writer.send(six.b('x'))
+
+        except socket.error:
+            # the watcher has already stopped and closed the socket
+            pass
+
+    def _watch_idle_connections(self):
+        while not self.closed:
+            with self.connections_lock:
+                idle_connections = dict(self.idle_connections)
+
+            idle_connections_gauge.labels(self.port_label).set(len(idle_connections))
+
+            readable, _, _ = select.select([self._wakeup_reader] + list(idle_connections), [], [], 1.0)
+
+            if self._wakeup_reader in readable:
+                self._wakeup_reader.recv(1024)
+
+            now = time.time()
+
+            for connection, (client_address, idle_since) in idle_connections.items():
+                if connection in readable:
+                    with self.connections_lock:
+                        self.idle_connections.pop(connection, None)
+
+                    self.process_request(connection, client_address)
+
+                elif now - idle_since > self.keep_alive_timeout:
+                    with self.connections_lock:
+                        self.idle_connections.pop(connection, None)
+
+                    self.shutdown_request(connection)
+
+        with self.connections_lock:
+            idle_connections, self.idle_connections = self.idle_connections, dict()
+
+        for connection in idle_connections:
+            self.shutdown_request(connection)
+
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
+
+    def server_close(self):
+        BaseHTTPServer.HTTPServer.server_close(self)
+
+        with self.connections_lock:
+            self.closed = True
+
+            # the connections being served would be kept alive otherwise
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+
+                except socket.error:
+                    pass
+
+        self._wakeup()
+
+        for _ in range(len(self.workers) - 1):
+            self.pending.put(None)
+
 
 class HttpServer(object):
+    pool_size = 4
+    queue_size = 32
+    keep_alive_timeout = 5
+
     def __init__(self, port):
         self.port = port
 
@@ -21,9 +208,23 @@ class HttpServer(object):
 
     def _get_request_handler(self):
         handler = self._handle_request
+        keep_alive_timeout = self.keep_alive_timeout
 
         class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            # a connection only holds a worker thread while reading and handling a request
+            timeout = keep_alive_timeout
+
+            def handle(self):
+                # the server waits for the next request on the connection instead
+                self.close_connection = True
+                self.handle_one_request()
+
             def do_POST(self):
+                # the body has to be consumed before the next request on the connection
+                self.body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
                 try:
                     handler(self)
 
@@ -33,11 +234,9 @@ class HttpServer(object):
                     self.end_headers()
 
                     self.wfile.write(six.b('OK\n'))
-                    self.wfile.close()
 
                 except Exception:
                     self.send_error(500)
-                    self.end_headers()
 
                     raise
 
@@ -47,12 +246,10 @@ class HttpServer(object):
         return RequestHandler
 
     def _run_server(self):
-        class Server(BaseHTTPServer.HTTPServer, socketserver.ThreadingMixIn):
-            pass
-
         request_handler = self._get_request_handler()
 
-        self._httpd = Server(('', self.port), request_handler)
+        self._httpd = PooledHTTPServer(('', self.port), request_handler,
+                                       self.pool_size, self.queue_size, self.keep_alive_timeout)
         self._httpd.serve_forever()
 
     def start(self):
@@ -1,8 +1,11 @@
+import re
+from functools import partial
+
 from resources import NetworkList, TaskList
-from utils import EnhancedDict, EnhancedList
+from utils import EnhancedDict, EnhancedList, TrackedDict
 
 
-class ContainerInfo(EnhancedDict):
+class ContainerInfo(TrackedDict):
     def __init__(self, container, **kwargs):
         super(ContainerInfo, self).__init__()
 
@@ -23,6 +26,10 @@ class ContainerInfo(EnhancedDict):
         self.update(info)
         self.update(kwargs)
 
+    @classmethod
+    def from_summary(cls, summary, inspect, **kwargs):
+        return SparseContainerInfo(summary, inspect, **kwargs)
+
     @staticmethod
     def split_env(values):
         return map(lambda x: x.split('=', 1), values) if values else dict()
@@ -50,13 +57,94 @@ class ContainerInfo(EnhancedDict):
         )
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(dict.get(self, 'id'))
 
     def __eq__(self, other):
         return self.id == other.id
 
 
-class TaskInfo(EnhancedDict):
+class SparseContainerInfo(ContainerInfo):
+    INSPECT_FIELDS = ('raw', 'env', 'image')
+
+    HEALTH_PATTERN = re.compile(r'\((healthy|unhealthy|health: starting)\)')
+
+    def __init__(self, summary, inspect, **kwargs):
+        super(ContainerInfo, self).__init__()
+
+        self._inspect = partial(inspect, summary['Id'])
+
+        info = {
+            'id': summary['Id'],
+            'short_id': summary['Id'][:12],
+            'name': summary['Names'][0].lstrip('/') if summary.get('Names') else None,
+            'status': summary.get('State'),
+            'health': self._health(summary.get('Status')),
+            'labels': EnhancedDict(summary.get('Labels') or dict()).default(''),
+            'networks': self._summary_networks(summary),
+            'ports': self._ports(self._summary_ports(summary))
+        }
+
+        # the summary has the image ID instead of the configured reference once the tag moved
+        if not self._is_image_id(summary.get('Image'), summary.get('ImageID')):
+            info['image'] = summary.get('Image')
+
+        self.update(info)
+        self.update(kwargs)
+
+    @staticmethod
+    def _is_image_id(image, image_id):
+        return image is not None and (image == image_id or image.startswith('sha256:'))
+
+    @classmethod
+    def _health(cls, status):
+        match = cls.HEALTH_PATTERN.search(status or '')
+
+        if not match:
+            return 'unknown'
+
+        return match.group(1).replace('health: ', '')
+
+    @staticmethod
+    def _summary_networks(summary):
+        result = NetworkList()
+
+        for name, network in ((summary.get('NetworkSettings') or dict()).get('Networks') or dict()).items():
+            result.append(EnhancedDict(
+                name=name,
+                id=network.get('NetworkID'),
+                ip_address=network.get('IPAddress')
+            ))
+
+        return result
+
+    @staticmethod
+    def _summary_ports(summary):
+        # published and exposed ports, listed once per host address
+        ports = set('%s/%s' % (port['PrivatePort'], port.get('Type', 'tcp'))
+                    for port in summary.get('Ports') or list() if 'PrivatePort' in port)
+
+        return sorted(ports)
+
+    def __contains__(self, item):
+        return item in self.INSPECT_FIELDS or super(SparseContainerInfo, self).__contains__(item)
+
+    def __missing__(self, item):
+        if item not in self.INSPECT_FIELDS:
+            raise KeyError(item)
+
+        # the fields missing from the list summary need a full inspect
+        container = self._inspect()
+
+        self.update(raw=container, env=EnhancedDict(
+            self.split_env(container.attrs['Config'].get('Env', list()))
+        ).default(''))
+
+        self.setdefault('image', container.attrs['Config'].get('Image'))
+
+        return dict.__getitem__(self, item)
+
+
+class TaskInfo(TrackedDict):
     def __init__(self, service, task, **kwargs):
         super(TaskInfo, self).__init__()
 
@@ -105,14 +193,14 @@ class TaskInfo(EnhancedDict):
         )
 
     def __hash__(self):
-        return hash(self.id)
+        return hash(dict.get(self, 'id'))
 
     def __eq__(self, other):
         return self.id == other.id
 
 
-class ServiceInfo(EnhancedDict):
-    def __init__(self, service, desired_task_state='running', **kwargs):
+class ServiceInfo(TrackedDict):
+    def __init__(self, service, desired_task_state='running', raw_tasks=None, **kwargs):
         super(ServiceInfo, self).__init__()
 
         info = {
@@ -130,14 +218,10 @@ class ServiceInfo(EnhancedDict):
                                     ip_addresses=EnhancedList())
         }
 
-        if desired_task_state:
-            task_filters = {'desired-state': desired_task_state}
-
-        else:
-            task_filters = None
+        if raw_tasks is None:
+            raw_tasks = service.tasks(filters=self.task_filters(desired_task_state))
 
-        info['tasks'] = TaskList(TaskInfo(service, task)
-                                 for task in service.tasks(filters=task_filters))
+        info['tasks'] = TaskList(TaskInfo(service, task) for task in raw_tasks)
 
         self.update(info)
 
@@ -147,6 +231,11 @@ class ServiceInfo(EnhancedDict):
 
         self.update(kwargs)
 
+    @staticmethod
+    def task_filters(desired_task_state):
+        if desired_task_state:
+            return {'desired-state': desired_task_state}
+
     def process_ingress(self):
         virtual_ips = self.raw.attrs['Endpoint'].get('VirtualIPs', list())
 
@@ -223,13 +312,13 @@ class ServiceInfo(EnhancedDict):
             self.ports[protocol].append(target)
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(dict.get(self, 'raw'))
 
     def __eq__(self, other):
         return self.id == other.id
 
 
-class NodeInfo(EnhancedDict):
+class NodeInfo(TrackedDict):
     def __init__(self, node, **kwargs):
         super(NodeInfo, self).__init__()
 
@@ -256,7 +345,7 @@ class NodeInfo(EnhancedDict):
         self.update(kwargs)
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(dict.get(self, 'raw'))
 
     def __eq__(self, other):
         return self.id == other.id
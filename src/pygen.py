@@ -1,14 +1,20 @@
-import re
+import os
+import sys
 import threading
+from functools import partial
 
 from actions import RestartAction, SignalAction
 from api import *
 from errors import *
+from event_matcher import EventMatcher
 from http_manager import Manager
 from metrics import MetricsServer, Summary
-from templates import initialize_template, get_template_variables
+from render_queue import RenderQueue
+from targets import Target
+from template_watcher import TemplateWatcher
+from templates import initialize_template, find_template_files, get_template_variables
 from timer import NotificationTimer
-from utils import get_logger
+from utils import DependencyTracker, get_logger
 
 logger = get_logger('pygen')
 
@@ -28,28 +34,57 @@ class PyGen(object):
     DEFAULT_INTERVALS = [0.5, 2]
     DEFAULT_REPEAT_INTERVAL = 0
     DEFAULT_EVENTS = ['start', 'stop', 'die', 'health_status']
+    EVENT_TYPES = ['container', 'service']
 
     def __init__(self, **kwargs):
-        self.target_path = kwargs.get('target')
         self.template_source = kwargs.get('template')
-        self.restart_targets = kwargs.get('restart', self.EMPTY_LIST)
-        self.signal_targets = kwargs.get('signal', self.EMPTY_LIST)
         self.events = kwargs.get('events', self.DEFAULT_EVENTS)
+        self.watch_labels = kwargs.get('watch_labels', self.EMPTY_LIST)
         self.one_shot = kwargs.get('one_shot', False)
+        self.stream = kwargs.get('stream', False)
+        self.track_dependencies = kwargs.get('track_dependencies', False)
         self.update_lock = threading.Lock()
+        self.render_queue = RenderQueue(self.update_target)
 
-        logger.debug('Targets to restart on changes: [%s]',
-                     ', '.join(self.restart_targets))
-        logger.debug('Targets to signal on changes: [%s]',
-                     ', '.join('%s <%s>' % (target, signal) for target, signal in self.signal_targets))
+        self._cycle_args = None
+        self._cycle_state = None
+        self._last_state = None
 
         if not self.template_source:
             raise PyGenException('No template is defined')
 
-        else:
-            self.template = initialize_template(self.template_source)
+        target_options = {
+            'atomic': kwargs.get('atomic_write', False),
+            'fsync': kwargs.get('fsync', False)
+        }
+
+        template_options = {
+            'bytecode_cache': kwargs.get('bytecode_cache'),
+            'precompiled': kwargs.get('precompiled'),
+            'no_ssl_check': kwargs.get('no_ssl_check', False),
+            'http_cache': kwargs.get('template_cache'),
+            'template_refresh': kwargs.get('template_refresh', 0)
+        }
+
+        self.targets = [Target(initialize_template(self.template_source, **template_options),
+                               path=kwargs.get('target'),
+                               restart=kwargs.get('restart', self.EMPTY_LIST),
+                               signal=kwargs.get('signal', self.EMPTY_LIST),
+                               **target_options)]
+
+        for output in kwargs.get('output', self.EMPTY_LIST):
+            self.targets.append(self._parse_output(output, template_options, **target_options))
 
-            logger.debug('Template successfully initialized')
+        for target in self.targets:
+            logger.debug('Template successfully initialized for %s', target.name)
+            logger.debug('Targets to restart on changes of %s: [%s]',
+                         target.name, ', '.join(target.restart_targets))
+            logger.debug('Targets to signal on changes of %s: [%s]',
+                         target.name, ', '.join('%s <%s>' % (name, signal) for name, signal in target.signal_targets))
+
+        self.event_matcher = EventMatcher(self.events, types=self._watched_event_types(), labels=self.watch_labels)
+
+        logger.debug('Watching events: %s', self.event_matcher.filters)
 
         intervals = kwargs.get('interval', self.DEFAULT_INTERVALS)
 
@@ -72,22 +107,49 @@ class PyGen(object):
 
         logger.debug('Notification intervals set as min=%.2f max=%.2f', min_interval, max_interval)
 
-        self.timer = NotificationTimer(self.signal, min_interval, max_interval)
+        for target in self.targets:
+            target.timer = NotificationTimer(partial(self.signal, target), min_interval, max_interval,
+                                             name='notification for %s' % target.name)
 
         repeat_interval = kwargs.get('repeat', self.DEFAULT_REPEAT_INTERVAL)
 
         if repeat_interval > 0:
-            self.repeat_timer = NotificationTimer(self._update_target, repeat_interval, repeat_interval)
+            self.repeat_timer = NotificationTimer(partial(self.request_update, 'repeat'),
+                                                  repeat_interval, repeat_interval, name='repeated update')
 
             logger.debug('Repeat interval set as %.2f seconds', repeat_interval)
 
         else:
             self.repeat_timer = None
 
-        self.api = DockerApi(kwargs.get('docker_address'))
+        if kwargs.get('watch_templates') and not self.one_shot:
+            self.template_watcher = TemplateWatcher(self.reload_templates)
+
+        else:
+            self.template_watcher = None
+
+        template_refresh = template_options['template_refresh']
+
+        if template_refresh > 0 and not self.one_shot:
+            self.template_timer = NotificationTimer(self.check_templates, template_refresh, template_refresh,
+                                                    name='template check')
+
+            logger.debug('Checking the templates for changes every %.2f seconds', template_refresh)
+
+        else:
+            self.template_timer = None
+
+        self.api = DockerApi(kwargs.get('docker_address'),
+                             state_cache=kwargs.get('state_cache', 0),
+                             task_workers=kwargs.get('task_workers', 0),
+                             compact_models=kwargs.get('compact_models', False),
+                             state_ttl=kwargs.get('state_ttl', 0))
 
         logger.debug('Successfully connected to the Docker API')
 
+        if self.api.state_cache:
+            logger.debug('State cache enabled, verifying it every %.2f seconds', self.api.state_cache.resync_interval)
+
         if kwargs.get('swarm_manager', False):
             if self.one_shot:
                 raise PyGenException('Swarm manager is not available in one-shot mode')
@@ -107,23 +169,173 @@ class PyGen(object):
 
         logger.debug('Metrics are exposed on port %s' % metrics_port)
 
+    @staticmethod
+    def _parse_output(output, template_options, **kwargs):
+        if len(output) < 2:
+            raise PyGenException('Invalid output, expected <TEMPLATE> <TARGET> [<ACTION> ...]: %s' % ' '.join(output))
+
+        template_source, path = output[:2]
+        restart, signal = list(), list()
+
+        for action in output[2:]:
+            action_type, _, action_target = action.partition('=')
+
+            if action_type == 'restart' and action_target:
+                restart.append(action_target)
+
+            elif action_type == 'signal' and ':' in action_target:
+                signal.append(tuple(action_target.rsplit(':', 1)))
+
+            else:
+                raise PyGenException('Invalid action for %s, expected restart=<CONTAINER> or '
+                                     'signal=<CONTAINER>:<SIGNAL>: %s' % (path, action))
+
+        return Target(initialize_template(template_source, **template_options),
+                      path=path, restart=restart, signal=signal, **kwargs)
+
+    @property
+    def primary_target(self):
+        return self.targets[0]
+
+    @property
+    def template(self):
+        return self.primary_target.template
+
+    @template.setter
+    def template(self, template):
+        self.primary_target.template = template
+
+    @property
+    def target_path(self):
+        return self.primary_target.path
+
+    @property
+    def restart_targets(self):
+        return self.primary_target.restart_targets
+
+    @restart_targets.setter
+    def restart_targets(self, targets):
+        self.primary_target.restart_targets = targets
+
+    @property
+    def signal_targets(self):
+        return self.primary_target.signal_targets
+
+    @signal_targets.setter
+    def signal_targets(self, targets):
+        self.primary_target.signal_targets = targets
+
+    @property
+    def timer(self):
+        return self.primary_target.timer
+
+    @property
+    def state_variables(self):
+        state_variables = set()
+
+        for target in self.targets:
+            if target.state_variables is None:
+                return None
+
+            state_variables.update(target.state_variables)
+
+        return state_variables
+
+    def _watched_event_types(self):
+        state_variables = self.state_variables
+
+        if state_variables is None or state_variables.intersection(('services', 'all_services')):
+            return self.EVENT_TYPES
+
+        logger.info('Not watching service events, the templates do not use services')
+
+        # container events can still change the tasks of services
+        return [event_type for event_type in self.EVENT_TYPES if event_type != 'service']
+
     @generation_summary.time()
-    def generate(self):
-        state = self.api.state
+    def generate(self, target=None):
+        target = target or self.primary_target
+        template_args = self._template_args()
+
+        if not self.track_dependencies:
+            return target.template.render(**template_args)
+
+        target.dependencies = None
+
+        tracker = DependencyTracker()
+
+        with tracker:
+            content = target.template.render(**template_args)
+
+        target.dependencies = tracker
+
+        return content
+
+    def generate_stream(self, target=None):
+        target = target or self.primary_target
+        template_args = self._template_args()
+
+        if not self.track_dependencies:
+            return target.template.generate(**template_args)
+
+        return self._generate_tracked_stream(target, template_args)
+
+    @staticmethod
+    def _generate_tracked_stream(target, template_args):
+        target.dependencies = None
+
+        tracker = DependencyTracker()
+        chunks = target.template.generate(**template_args)
+
+        while True:
+            with tracker:
+                chunk = next(chunks, None)
+
+            if chunk is None:
+                break
+
+            yield chunk
+
+        target.dependencies = tracker
+
+    def _template_args(self):
+        if self._cycle_args:
+            return self._cycle_args
+
+        state = self._cycle_state if self._cycle_state is not None else self.api.state
         variables = get_template_variables()
 
+        self._last_state = state
+
         template_args = dict(variables)
-        template_args.update(state)
 
-        logger.debug('Generating content based on information from %s containers and %s services',
-                     len(state.containers), len(state.services))
+        state_variables = self.state_variables
+
+        if state_variables is None:
+            template_args.update(state)
+
+        else:
+            template_args.update((name, value) for name, value in state.items() if name in state_variables)
+
+        logger.debug('Generating content based on the current Docker state')
+
+        if self._cycle_args is not None:
+            self._cycle_args.update(template_args)
+
+        return template_args
+
+    def request_update(self, source, allow_repeat=False):
+        if not self.render_queue.is_running:
+            self.update_target(allow_repeat=allow_repeat)
+            return
 
-        return self.template.render(**template_args)
+        # the render worker handles every pending request with a single update
+        self.render_queue.request(source, allow_repeat=allow_repeat)
 
-    def update_target(self, allow_repeat=False):
+    def update_target(self, allow_repeat=False, state=None):
         try:
             # update as soon as the event arrives
-            self._update_target()
+            self._update_target(state)
 
             # optionally re-run the generation after some time
             # can be useful for the delayed {health_status -> task state} change
@@ -134,57 +346,175 @@ class PyGen(object):
             logger.error('Failed to update the target file: %s' % ex, exc_info=1)
 
     @update_target_summary.time()
-    def _update_target(self):
-        if not self.target_path:
-            logger.info('Printing generated content to stdout')
+    def _update_target(self, state=None):
+        self._update_targets(self.targets, state=state)
 
-            print(self.generate())
-            self.timer.schedule()
+    def _update_targets(self, targets, reuse_state=False, state=None):
+        with self.update_lock:
+            # every target is generated from the same state snapshot
+            self._cycle_args = dict()
 
-            return
+            if reuse_state:
+                self._cycle_state = self._last_state
 
-        with self.update_lock:
-            if not self._update_target_file():
-                return
+            elif state is not None:
+                self._cycle_state = state
 
-        self.timer.schedule()
+            updated_targets = list()
 
-    def _update_target_file(self):
-        logger.info('Updating target file at %s', self.target_path)
+            try:
+                for target in targets:
+                    try:
+                        if self._update(target):
+                            updated_targets.append(target)
 
-        existing_content = ''
+                    except Exception as ex:
+                        # the targets already written still need their actions
+                        logger.error('Failed to update %s: %s' % (target.name, ex), exc_info=1)
 
-        if os.path.exists(self.target_path):
-            with open(self.target_path, 'r') as target:
-                existing_content = target.read()
+            finally:
+                self._cycle_args = None
+                self._cycle_state = None
 
-        content = self.generate()
+        for target in updated_targets:
+            target.timer.schedule()
 
-        if content == existing_content:
-            logger.info('Skip updating target file, contents have not changed')
+    def _update(self, target):
+        if target.dependencies and not target.dependencies.changed(self._template_args()):
+            logger.info('Skip generating %s, the state it depends on has not changed', target.name)
 
             return False
 
-        with open(self.target_path, 'w') as target:
-            target.write(content)
+        if not target.path:
+            logger.info('Printing generated content to stdout')
+
+            if self.stream:
+                for chunk in self.generate_stream(target):
+                    sys.stdout.write(chunk)
+
+                sys.stdout.write('\n')
+
+            else:
+                print(self.generate(target))
+
+            return True
+
+        return self._update_target_file(target)
+
+    def _update_target_file(self, target=None):
+        target = target or self.primary_target
+
+        logger.info('Updating target file at %s', target.path)
+
+        if self.stream:
+            with generation_summary.time():
+                updated = target.file.update_stream(self.generate_stream(target))
 
-        logger.info('Target file updated at %s', self.target_path)
+        else:
+            updated = target.file.update(self.generate(target))
+
+        if not updated:
+            logger.info('Skip updating target file at %s, contents have not changed', target.path)
+
+            return False
+
+        logger.info('Target file updated at %s', target.path)
 
         return True
 
-    def signal(self):
-        logger.info('Sending notifications')
+    def signal(self, target=None):
+        target = target or self.primary_target
+
+        logger.info('Sending notifications for %s', target.name)
+
+        self._restart_targets(target)
+        self._signal_targets(target)
+
+    def _restart_targets(self, target):
+        for name in target.restart_targets:
+            self.api.run_action(RestartAction, name, manager=self.swarm_manager)
+
+    def _signal_targets(self, target):
+        for name, signal in target.signal_targets:
+            self.api.run_action(SignalAction, name, signal, manager=self.swarm_manager)
+
+    def check_templates(self):
+        try:
+            changed_targets = [target for target in self.targets if not target.template.is_up_to_date]
+
+            for target in changed_targets:
+                logger.info('The template of %s has changed, reloading it', target.name)
+
+                template = target.template.environment.get_template(target.template.name)
+
+                # a running update would keep the dependencies of the old template otherwise
+                with self.update_lock:
+                    target.template = template
+
+            if changed_targets:
+                self.request_update('templates')
+
+        except Exception as ex:
+            logger.error('Failed to check the templates for changes: %s' % ex, exc_info=1)
+
+        finally:
+            if self.template_timer:
+                self.template_timer.schedule()
+
+    def reload_templates(self, changed_files):
+        affected_targets = list()
+
+        for target in self.targets:
+            watched = find_template_files(target.template)
+
+            if watched and (watched[0] & changed_files or
+                            any(os.path.dirname(path) in watched[1] for path in changed_files)):
+                affected_targets.append(target)
+
+        for target in affected_targets:
+            logger.info('The template of %s has changed, reloading it', target.name)
+
+            # included templates are reloaded by Jinja2 when their modification time changes
+            template = target.template.environment.get_template(target.template.name)
+
+            with self.update_lock:
+                target.template = template
+
+        if affected_targets:
+            self._update_targets(affected_targets, reuse_state=True)
+
+            if self.template_watcher:
+                # the included templates might have changed too
+                self._watch_template_files()
 
-        self._restart_targets()
-        self._signal_targets()
+    def _watch_template_files(self):
+        files, directories = set(), set()
 
-    def _restart_targets(self):
-        for target in self.restart_targets:
-            self.api.run_action(RestartAction, target, manager=self.swarm_manager)
+        for target in self.targets:
+            watched = find_template_files(target.template)
 
-    def _signal_targets(self):
-        for target, signal in self.signal_targets:
-            self.api.run_action(SignalAction, target, signal, manager=self.swarm_manager)
+            if watched:
+                files.update(watched[0])
+                directories.update(watched[1])
+
+        self.template_watcher.watch(files, directories)
+
+    def use_scheduler(self, scheduler):
+        timers = [target.timer for target in self.targets] + [self.repeat_timer, self.template_timer]
+
+        for timer in timers:
+            if timer:
+                timer.scheduler = scheduler
+
+    def start_watching(self):
+        if self.template_timer:
+            self.template_timer.schedule()
+
+        if self.template_watcher:
+            self._watch_template_files()
+            self.template_watcher.start()
+
+        self.render_queue.start()
 
     def watch(self, **kwargs):
         if self.one_shot:
@@ -192,29 +522,25 @@ class PyGen(object):
 
             return
 
+        self.start_watching()
+
         for event in self.read_events(**kwargs):
             logger.info('Received %s event from %s',
                         event.get('status'),
                         event.get('Actor', self.EMPTY_DICT).get('Attributes', self.EMPTY_DICT).get('name', '<?>'))
 
-            self.update_target(allow_repeat=True)
+            self.request_update('event', allow_repeat=True)
 
     def read_events(self, **kwargs):
         kwargs['decode'] = True
+        kwargs.setdefault('filters', self.event_matcher.filters)
 
         for event in self.api.events(**kwargs):
             if self.is_watched(event):
                 yield event
 
     def is_watched(self, event):
-        if event.get('status') in self.events:
-            return True
-
-        # health_status comes as 'health_status: healthy' for example
-        if any(re.match(r'%s:.+' % item, event.get('status', '')) for item in self.events):
-            return True
-
-        return False
+        return self.event_matcher.matches(event)
 
     def expose_metrics(self, port):
         server = MetricsServer(port)
@@ -223,6 +549,16 @@ class PyGen(object):
         return server
 
     def stop(self):
+        self.render_queue.stop()
+
+        if self.template_watcher:
+            self.template_watcher.stop()
+
+        template_timer, self.template_timer = self.template_timer, None
+
+        if template_timer:
+            template_timer.cancel()
+
         if self.metrics_server:
             self.metrics_server.shutdown()
 
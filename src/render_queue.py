@@ -0,0 +1,86 @@
+import threading
+import time
+
+from metrics import Counter, Histogram
+from utils import get_logger
+
+logger = get_logger('pygen-render-queue')
+
+# metrics
+update_request_counter = Counter(
+    'pygen_update_request_count', 'Number of update requests received',
+    labelnames=('source',)
+)
+coalesced_request_counter = Counter(
+    'pygen_update_coalesced_count', 'Number of update requests merged into an already pending update'
+)
+queue_lag_histogram = Histogram(
+    'pygen_update_queue_lag_seconds', 'Time between the first pending update request and the start of the update'
+)
+
+
+class RenderQueue(object):
+    def __init__(self, update_function):
+        self.update_function = update_function
+
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._pending_since = None
+        self._allow_repeat = False
+        self._stopped = False
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._condition:
+            if self.is_running:
+                return
+
+            self._stopped = False
+
+            self._thread = threading.Thread(target=self._run, name='render-queue')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def request(self, source, allow_repeat=False):
+        update_request_counter.labels(source).inc()
+
+        with self._condition:
+            if self._pending:
+                coalesced_request_counter.inc()
+
+            else:
+                self._pending_since = time.time()
+
+            self._pending += 1
+            self._allow_repeat = self._allow_repeat or allow_repeat
+
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+
+                if self._stopped:
+                    return
+
+                pending, self._pending = self._pending, 0
+                allow_repeat, self._allow_repeat = self._allow_repeat, False
+
+                queue_lag_histogram.observe(time.time() - self._pending_since)
+
+            if pending > 1:
+                logger.debug('Handling %d update requests with a single update', pending)
+
+            # requests arriving during the update are handled by the next one
+            self.update_function(allow_repeat=allow_repeat)
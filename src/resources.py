@@ -1,66 +1,253 @@
+import bisect
+
 import six
 
 from docker_helper import get_current_container_id
 
-from utils import EnhancedList
+from utils import EnhancedList, DependencyTracker, iter_untracked
+
+
+class MatchingIndex(object):
+    def __init__(self, resources, index_keys):
+        self.resources = resources
+        self.tables = dict()
+
+        ids = list()
+
+        for position, resource in enumerate(resources):
+            for table, key in index_keys(resource):
+                if isinstance(key, six.string_types):
+                    positions = self.tables.setdefault(table, dict()).setdefault(key, list())
+
+                    if not positions or positions[-1] != position:
+                        positions.append(position)
+
+            if isinstance(resource.id, six.string_types):
+                ids.append((resource.id, position))
+
+        ids.sort()
+
+        self.ids = [resource_id for resource_id, _ in ids]
+        self.id_positions = [position for _, position in ids]
+
+    def lookup(self, table, key):
+        return [self.resources[position] for position in self.tables.get(table, dict()).get(key, list())]
+
+    def prefixed(self, prefix):
+        positions = list()
+
+        for idx in range(bisect.bisect_left(self.ids, prefix), len(self.ids)):
+            if not self.ids[idx].startswith(prefix):
+                break
+
+            positions.append(self.id_positions[idx])
+
+        return [self.resources[position] for position in sorted(positions)]
 
 
 class ResourceList(EnhancedList):
+    state_name = None
+
+    _indexes = None
+
+    def __iter__(self):
+        self._record_access()
+        return super(ResourceList, self).__iter__()
+
+    def __len__(self):
+        self._record_access()
+        return super(ResourceList, self).__len__()
+
+    def __getitem__(self, item):
+        self._record_access()
+        return super(ResourceList, self).__getitem__(item)
+
+    def _record_access(self):
+        if self.state_name:
+            tracker = DependencyTracker.current()
+
+            if tracker:
+                tracker.record_list(self.state_name, self)
+
+    def __setitem__(self, key, value):
+        self._invalidate_index()
+        super(ResourceList, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._invalidate_index()
+        super(ResourceList, self).__delitem__(key)
+
+    def __setslice__(self, i, j, sequence):  # Python 2 only
+        self._invalidate_index()
+        super(ResourceList, self).__setslice__(i, j, sequence)
+
+    def __delslice__(self, i, j):  # Python 2 only
+        self._invalidate_index()
+        super(ResourceList, self).__delslice__(i, j)
+
+    def __iadd__(self, other):
+        self._invalidate_index()
+        return super(ResourceList, self).__iadd__(other)
+
+    def __imul__(self, other):
+        self._invalidate_index()
+        return super(ResourceList, self).__imul__(other)
+
+    def append(self, item):
+        self._invalidate_index()
+        super(ResourceList, self).append(item)
+
+    def extend(self, items):
+        self._invalidate_index()
+        super(ResourceList, self).extend(items)
+
+    def insert(self, index, item):
+        self._invalidate_index()
+        super(ResourceList, self).insert(index, item)
+
+    def remove(self, item):
+        self._invalidate_index()
+        super(ResourceList, self).remove(item)
+
+    def pop(self, *args):
+        self._invalidate_index()
+        return super(ResourceList, self).pop(*args)
+
+    def clear(self):
+        self._invalidate_index()
+        del self[:]
+
+    def sort(self, *args, **kwargs):
+        self._invalidate_index()
+        super(ResourceList, self).sort(*args, **kwargs)
+
+    def reverse(self):
+        self._invalidate_index()
+        super(ResourceList, self).reverse()
+
+    def _invalidate_index(self):
+        self._indexes = None
+
+    def _matching_index(self, name='primary'):
+        self._record_access()
+
+        index_keys = self._env_index_keys if name == 'env' else self._index_keys
+
+        if self._indexes is None:
+            self._indexes = dict()
+
+        tracker = DependencyTracker.current()
+        index, index_tracker = self._indexes.get(name, (None, None))
+
+        if index is None:
+            index = MatchingIndex(list(iter_untracked(self)), index_keys)
+
+        elif tracker and tracker is not index_tracker:
+            # the template being tracked now depends on the attributes the index was built from
+            for resource in iter_untracked(self):
+                for _ in index_keys(resource):
+                    pass
+
+        else:
+            return index
+
+        self._indexes[name] = (index, tracker)
+
+        return index
+
+    def _index_keys(self, resource):
+        yield 'primary', resource.id
+        yield 'primary', resource.name
+
+        if resource.labels:
+            yield 'primary', resource.labels.get('pygen.target')
+
+    @staticmethod
+    def _env_index_keys(resource):
+        # kept apart, so the containers are only inspected when matching by a target
+        if resource.env:
+            yield 'env', resource.env.get('PYGEN_TARGET')
+
+    @staticmethod
+    def _swarm_service_keys(resource):
+        labels = resource.labels or dict()
+
+        service_name = labels.get('com.docker.swarm.service.name')
+
+        if service_name:
+            yield service_name
+
+            stack_prefix = '%s_' % labels.get('com.docker.stack.namespace')
+
+            if 'com.docker.stack.namespace' in labels and service_name.startswith(stack_prefix):
+                yield service_name[len(stack_prefix):]
+
     def matching(self, target):
-        return type(self)(self._unique_matching(target))
+        return self.matching_any([target])
 
     def not_matching(self, target):
+        return self.not_matching_any([target])
+
+    def matching_any(self, targets):
+        if isinstance(targets, six.string_types):
+            targets = [targets]
+
+        return type(self)(self._unique_matching(targets))
+
+    def not_matching_any(self, targets):
+        if isinstance(targets, six.string_types):
+            targets = [targets]
+
+        excluded = set(id(match) for target in targets for match in self._matching(target))
+
         return type(self)(resource
                           for resource in self
-                          if resource not in self.matching(target))
+                          if id(resource) not in excluded)
 
-    def _unique_matching(self, target):
+    def _unique_matching(self, targets):
         yielded = set()
 
-        for match in self._matching(target):
-            if match not in yielded:
-                yielded.add(match)
-                yield match
+        for target in targets:
+            for match in self._matching(target):
+                if match not in yielded:
+                    yielded.add(match)
+                    yield match
 
     def _matching(self, target):
         if isinstance(target, six.string_types):
-            for resource in self:
-                if resource.id == target or resource.name == target:
-                    yield resource
+            index = self._matching_index()
 
-                elif hasattr(resource, 'labels') and resource.labels and target == resource.labels.get('pygen.target'):
-                    yield resource
+            for resource in index.lookup('primary', target):
+                yield resource
 
-                elif hasattr(resource, 'env') and resource.env and target == resource.env.get('PYGEN_TARGET'):
-                    yield resource
+            for resource in self._matching_index('env').lookup('env', target):
+                yield resource
 
             # try short IDs
-            for resource in self:
-                if resource.id.startswith(target):
-                    yield resource
+            for resource in index.prefixed(target):
+                yield resource
 
 
 class ContainerList(ResourceList):
+    def _index_keys(self, resource):
+        for key in super(ContainerList, self)._index_keys(resource):
+            yield key
+
+        # check compose services
+        yield 'service', resource.labels.get('com.docker.compose.service', '')
+
+        # check swarm services
+        for service_name in self._swarm_service_keys(resource):
+            yield 'service', service_name
+
     def _matching(self, target):
         for matching_resource in super(ContainerList, self)._matching(target):
             yield matching_resource
 
-        for container in self:
-            # check compose services
-            if target == container.labels.get('com.docker.compose.service', ''):
+        if isinstance(target, six.string_types):
+            for container in self._matching_index().lookup('service', target):
                 yield container
 
-            # check swarm services
-            service_name = container.labels.get('com.docker.swarm.service.name')
-
-            if service_name:
-                if target == service_name:
-                    yield container
-
-                if 'com.docker.stack.namespace' in container.labels:
-                    if service_name == '%s_%s' % (container.labels['com.docker.stack.namespace'], target):
-                        yield container
-
     @property
     def healthy(self):
         return self.with_health('healthy')
@@ -83,14 +270,22 @@ class ContainerList(ResourceList):
 
 
 class ServiceList(ResourceList):
+    def _index_keys(self, resource):
+        for key in super(ServiceList, self)._index_keys(resource):
+            yield key
+
+        stack_prefix = '%s_' % resource.labels.get('com.docker.stack.namespace')
+
+        if 'com.docker.stack.namespace' in resource.labels and resource.name.startswith(stack_prefix):
+            yield 'stack', resource.name[len(stack_prefix):]
+
     def _matching(self, target):
         for matching_resource in super(ServiceList, self)._matching(target):
             yield matching_resource
 
-        for service in self:
-            if 'com.docker.stack.namespace' in service.labels:
-                if service.name == '%s_%s' % (service.labels['com.docker.stack.namespace'], target):
-                    yield service
+        if isinstance(target, six.string_types):
+            for service in self._matching_index().lookup('stack', target):
+                yield service
 
     @property
     def self(self):
@@ -102,27 +297,25 @@ class ServiceList(ResourceList):
 
 
 class TaskList(ResourceList):
-    def _matching(self, target):
-        for matching_resource in super(TaskList, self)._matching(target):
-            yield matching_resource
+    def _index_keys(self, resource):
+        for key in super(TaskList, self)._index_keys(resource):
+            yield key
 
-        for task in self:
-            if target == task.container_id:
-                yield task
+        yield 'task', resource.container_id
 
-            # check swarm services
-            if target == task.service_id:
-                yield task
+        # check swarm services
+        yield 'task', resource.service_id
 
-            service_name = task.labels.get('com.docker.swarm.service.name')
+        for service_name in self._swarm_service_keys(resource):
+            yield 'task', service_name
 
-            if service_name:
-                if target == service_name:
-                    yield task
+    def _matching(self, target):
+        for matching_resource in super(TaskList, self)._matching(target):
+            yield matching_resource
 
-                if 'com.docker.stack.namespace' in task.labels:
-                    if service_name == '%s_%s' % (task.labels['com.docker.stack.namespace'], target):
-                        yield task
+        if isinstance(target, six.string_types):
+            for task in self._matching_index().lookup('task', target):
+                yield task
 
     def with_status(self, status):
         return type(self)(task for task in self if task.status.lower() == status.lower())
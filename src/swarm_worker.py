@@ -1,6 +1,6 @@
-import re
 import sys
 import json
+import time
 import signal
 import argparse
 
@@ -9,6 +9,8 @@ import requests
 
 from actions import Action
 from api import DockerApi
+from errors import PyGenException
+from event_matcher import EventMatcher
 from http_server import HttpServer
 from metrics import MetricsServer, Counter
 from utils import get_logger, set_log_level
@@ -28,12 +30,17 @@ send_counter = Counter(
 class Worker(HttpServer):
     manager_port = 9411
     worker_port = 9412
+    retry_delay = 0.5
 
     DEFAULT_EVENTS = ['start', 'stop', 'die', 'health_status']
+    EVENT_TYPES = ['container', 'service']
 
     EMPTY_DICT = dict()
 
-    def __init__(self, managers, retries=0, events=None, metrics_port=9414):
+    # keeps the connections to the managers alive between updates
+    _session = requests.Session()
+
+    def __init__(self, managers, retries=0, events=None, metrics_port=9414, watch_labels=None):
         super(Worker, self).__init__(self.worker_port)
 
         if any(isinstance(managers, string_type) for string_type in six.string_types):
@@ -43,6 +50,7 @@ class Worker(HttpServer):
 
         self.retries = retries
         self.events = events or self.DEFAULT_EVENTS
+        self.event_matcher = EventMatcher(self.events, types=self.EVENT_TYPES, labels=watch_labels)
         self.metrics = MetricsServer(metrics_port)
 
         self.api = DockerApi()
@@ -56,9 +64,7 @@ class Worker(HttpServer):
     def _handle_request(self, request):
         request_counter.labels(request.address_string()).inc()
 
-        length = int(request.headers['Content-Length'])
-
-        data = json.loads(request.rfile.read(length).decode('utf-8'))
+        data = json.loads(request.body.decode('utf-8'))
 
         self.handle_action(data.get('action'), *data.get('args', list()))
 
@@ -68,7 +74,7 @@ class Worker(HttpServer):
         self.api.run_action(action_type, *args)
 
     def watch_events(self):
-        for event in self.api.events(decode=True):
+        for event in self.api.events(decode=True, filters=self.event_matcher.filters):
             if self.is_watched(event):
                 logger.info('Received %s event from %s',
                             event.get('status'),
@@ -77,32 +83,40 @@ class Worker(HttpServer):
                 self.send_update(event.get('status'))
 
     def is_watched(self, event):
-        if event.get('status') in self.events:
-            return True
-
-        # health_status comes as 'health_status: healthy' for example
-        if any(re.match(r'%s:.+' % item, event.get('status', '')) for item in self.events):
-            return True
-
-        return False
+        return self.event_matcher.matches(event)
 
     def send_update(self, status):
         for manager in self.managers:
-            for _ in range(self.retries + 1):
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    # gives a restarting manager a moment before trying again
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
                 try:
-                    response = requests.post('http://%s:%d/' % (manager, self.manager_port), timeout=(5, 30))
+                    response_status, response = self._send_update_request(manager, self.manager_port)
+
+                    if response_status == 200:
+                        logger.info('Update (%s) sent to http://%s:%d/ : HTTP %s : %s',
+                                    status, manager, self.manager_port, response_status, response)
 
-                    logger.info('Update (%s) sent to http://%s:%d/ : HTTP %s : %s',
-                                status, manager, self.manager_port, response.status_code, response.text.strip())
+                        send_counter.labels(manager).inc()
 
-                    send_counter.labels(manager).inc()
+                        break
 
-                    break
+                    else:
+                        logger.error('Failed to send update to http://%s:%d/ : HTTP %s : %s',
+                                     manager, self.manager_port, response_status, response)
 
                 except Exception as ex:
                     logger.error('Failed to send update to http://%s:%d/: %s',
                                  manager, self.manager_port, ex, exc_info=1)
 
+    @classmethod
+    def _send_update_request(cls, manager, port):
+        response = cls._session.post('http://%s:%d/' % (manager, port), timeout=(5, 30))
+
+        return response.status_code, response.text.strip()
+
     def shutdown(self):
         super(Worker, self).shutdown()
 
@@ -125,6 +139,15 @@ def parse_arguments(args=sys.argv[1:]):
                         default=['start', 'stop', 'die', 'health_status'],
                         help='Docker events to watch and trigger updates for '
                              '(default: start, stop, die, health_status)')
+    parser.add_argument('--watch-labels',
+                        metavar='<LABEL>', required=False, nargs='+', default=list(),
+                        help='Only watch events from containers having these labels, '
+                             'given as <key> or <key>=<value>')
+
+    parser.add_argument('--runtime',
+                        required=False, choices=('threads', 'asyncio'), default='threads',
+                        help='Watch the events and send the updates on threads or '
+                             'on an asyncio event loop (Python 3.6+ only, default: threads)')
 
     parser.add_argument('--metrics',
                         metavar='<PORT>', required=False, type=int, default=9414,
@@ -160,7 +183,11 @@ if __name__ == '__main__':  # pragma: no cover
     if arguments.debug:
         set_log_level('DEBUG')
 
-    worker = Worker(arguments.manager, arguments.retries, arguments.events, arguments.metrics)
+    if arguments.runtime == 'asyncio' and sys.version_info < (3, 6):
+        raise PyGenException('The asyncio runtime needs Python 3.6 or newer')
+
+    worker = Worker(arguments.manager, arguments.retries, arguments.events, arguments.metrics,
+                    arguments.watch_labels)
 
     setup_signals(worker)
 
@@ -171,7 +198,13 @@ if __name__ == '__main__':  # pragma: no cover
 
         logger.info('Starting event watch loop')
 
-        worker.watch_events()
+        if arguments.runtime == 'asyncio':
+            from async_runtime import AsyncWorkerRuntime
+
+            AsyncWorkerRuntime(worker).run()
+
+        else:
+            worker.watch_events()
 
     except SystemExit:
         logger.info('Exiting...')
@@ -0,0 +1,224 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from templates import find_state_variables
+from utils import get_logger
+
+logger = get_logger('pygen-targets')
+
+# os.replace is not available on Python 2 but rename is atomic on POSIX
+replace_file = getattr(os, 'replace', os.rename)
+
+# the umask can only be read by changing it, so it is done once, before the update threads start
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+class TargetFile(object):
+    READ_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path, atomic=False, fsync=False):
+        self.path = path
+        self.atomic = atomic
+        self.fsync = fsync
+
+        self._digest = None
+        self._stat = None
+
+    @staticmethod
+    def digest(content):
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def update(self, content):
+        digest = self.digest(content)
+
+        if self._is_unchanged(digest):
+            return False
+
+        if self.atomic:
+            self._write_atomic(content)
+
+        else:
+            with io.open(self.path, 'w', encoding='utf-8') as target:
+                self._write(target, content)
+
+        self._remember(digest)
+
+        return True
+
+    def update_stream(self, chunks):
+        directory, filename = os.path.split(os.path.abspath(self.path))
+
+        handle, temp_path = tempfile.mkstemp(prefix='.%s.' % filename, suffix='.tmp', dir=directory)
+
+        try:
+            hasher = hashlib.sha1()
+
+            with io.open(handle, 'w', encoding='utf-8') as target:
+                for chunk in chunks:
+                    target.write(chunk)
+                    hasher.update(chunk.encode('utf-8'))
+
+                if self.fsync:
+                    target.flush()
+                    os.fsync(target.fileno())
+
+            digest = hasher.hexdigest()
+
+            if self._is_unchanged(digest):
+                os.remove(temp_path)
+
+                return False
+
+            self._swap(temp_path, directory)
+
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            raise
+
+        self._remember(digest)
+
+        return True
+
+    def _is_unchanged(self, digest):
+        current_stat = self._current_stat()
+
+        if self._stat is not None and self._stat == current_stat:
+            if self._digest == digest:
+                logger.debug('The last written content at %s is unchanged', self.path)
+
+                return True
+
+            # the file still has the content we wrote last time
+            return False
+
+        if current_stat is None:
+            return False
+
+        # the file was modified by someone else (or we don't know it yet)
+        if self._file_digest() == digest:
+            self._remember(digest)
+
+            return True
+
+        return False
+
+    def _file_digest(self):
+        hasher = hashlib.sha1()
+
+        with open(self.path, 'rb') as target:
+            for block in iter(lambda: target.read(self.READ_BLOCK_SIZE), b''):
+                hasher.update(block)
+
+        return hasher.hexdigest()
+
+    def _remember(self, digest):
+        self._digest = digest
+        self._stat = self._current_stat()
+
+    def _current_stat(self):
+        try:
+            stat = os.stat(self.path)
+
+        except OSError:
+            return None
+
+        return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime, stat.st_ctime
+
+    def _write(self, target, content):
+        target.write(content)
+
+        if self.fsync:
+            target.flush()
+            os.fsync(target.fileno())
+
+    def _write_atomic(self, content):
+        directory, filename = os.path.split(os.path.abspath(self.path))
+
+        handle, temp_path = tempfile.mkstemp(prefix='.%s.' % filename, suffix='.tmp', dir=directory)
+
+        try:
+            with io.open(handle, 'w', encoding='utf-8') as target:
+                self._write(target, content)
+
+            self._swap(temp_path, directory)
+
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            raise
+
+    def _swap(self, temp_path, directory):
+        self._copy_permissions(temp_path)
+
+        replace_file(temp_path, self.path)
+
+        if self.fsync:
+            self._fsync_directory(directory)
+
+    def _copy_permissions(self, temp_path):
+        try:
+            stat = os.stat(self.path)
+
+        except OSError:
+            # new file: use the permissions open() would create it with
+            os.chmod(temp_path, 0o666 & ~_umask)
+
+            return
+
+        os.chmod(temp_path, stat.st_mode & 0o7777)
+
+        try:
+            os.chown(temp_path, stat.st_uid, stat.st_gid)
+
+        except OSError as ex:
+            logger.warning('Failed to keep the ownership of %s: %s', self.path, ex)
+
+    @staticmethod
+    def _fsync_directory(directory):
+        handle = os.open(directory, os.O_RDONLY)
+
+        try:
+            os.fsync(handle)
+
+        finally:
+            os.close(handle)
+
+
+class Target(object):
+    _not_analyzed = object()
+
+    def __init__(self, template, path=None, restart=None, signal=None, atomic=False, fsync=False):
+        self.template = template
+        self.path = path
+        self.file = TargetFile(path, atomic=atomic, fsync=fsync) if path else None
+        self.restart_targets = list(restart or list())
+        self.signal_targets = list(signal or list())
+
+        self.timer = None
+
+    @property
+    def name(self):
+        return self.path or 'stdout'
+
+    @property
+    def template(self):
+        return self._template
+
+    @template.setter
+    def template(self, template):
+        self._template = template
+        self._state_variables = self._not_analyzed
+        self.dependencies = None
+
+    @property
+    def state_variables(self):
+        if self._state_variables is self._not_analyzed:
+            self._state_variables = find_state_variables(self._template)
+
+        return self._state_variables
@@ -0,0 +1,199 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+from utils import get_logger
+
+logger = get_logger('pygen-template-watcher')
+
+
+class Inotify(object):
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._directories = dict()
+
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'Failed to initialize inotify')
+
+    def add(self, directory):
+        if directory in self._directories.values():
+            return
+
+        wd = self._libc.inotify_add_watch(self.fd, directory.encode('utf-8'), self.WATCH_MASK)
+
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'Failed to watch %s' % directory)
+
+        self._directories[wd] = directory
+
+    def read(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+
+        except OSError:
+            return set()
+
+        paths = set()
+        offset = 0
+
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+
+            if wd in self._directories:
+                paths.add(os.path.join(self._directories[wd], name))
+
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class TemplateWatcher(object):
+    def __init__(self, callback, poll_interval=1.0, settle_time=0.1, use_inotify=True):
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.use_inotify = use_inotify
+
+        self.files = frozenset()
+        self.directories = frozenset()
+
+        self._inotify = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def watch(self, files, directories=None):
+        self.files = frozenset(os.path.abspath(path) for path in files)
+        self.directories = frozenset(os.path.abspath(path) for path in directories or list())
+
+        if self._inotify:
+            for directory in self._watched_directories():
+                try:
+                    self._inotify.add(directory)
+
+                except OSError as ex:
+                    logger.warning('Failed to watch %s for template changes: %s', directory, ex)
+
+    def start(self):
+        try:
+            if not self.use_inotify:
+                raise OSError('disabled')
+
+            self._inotify = Inotify()
+
+            for directory in self._watched_directories():
+                self._inotify.add(directory)
+
+            target = self._run_inotify
+
+            logger.info('Watching the templates for changes with inotify')
+
+        except (OSError, AttributeError) as ex:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+
+            target = self._run_polling
+
+            logger.info('Watching the templates for changes every %.2f seconds (inotify is not available: %s)',
+                        self.poll_interval, ex)
+
+        self._thread = threading.Thread(target=target, name='template-watcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def is_watched(self, path):
+        return path in self.files or os.path.dirname(path) in self.directories
+
+    def _watched_directories(self):
+        return set(os.path.dirname(path) for path in self.files) | set(self.directories)
+
+    def _run_inotify(self):
+        try:
+            while not self._stopped.is_set():
+                changed = self._inotify.read(self.poll_interval)
+
+                if changed:
+                    # editors tend to save a file in multiple steps
+                    changed.update(self._inotify.read(self.settle_time))
+
+                self._notify(changed)
+
+        finally:
+            self._inotify.close()
+
+    def _run_polling(self):
+        modification_times = self._modification_times()
+
+        while not self._stopped.wait(self.poll_interval):
+            current = self._modification_times()
+
+            self._notify(set(path for path in set(current) | set(modification_times)
+                             if current.get(path) != modification_times.get(path)))
+
+            modification_times = current
+
+    def _modification_times(self):
+        paths = set(self.files)
+
+        for directory in self.directories:
+            if os.path.isdir(directory):
+                paths.update(os.path.join(directory, name) for name in os.listdir(directory))
+
+        modification_times = dict()
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                modification_times[path] = (stat.st_mtime, stat.st_size)
+
+            except OSError:
+                pass
+
+        return modification_times
+
+    def _notify(self, paths):
+        changed = set(path for path in paths if self.is_watched(path))
+
+        if not changed:
+            return
+
+        logger.debug('Template files changed: %s', ', '.join(sorted(changed)))
+
+        try:
+            self.callback(changed)
+
+        except Exception as ex:
+            logger.error('Failed to process the template changes: %s' % ex, exc_info=1)
@@ -1,73 +1,300 @@
+import hashlib
+import io
+import json
 import os
 import re
+import threading
+import time
 
 import jinja2
+import jinja2.meta
 import requests
+import six
 import docker_helper
 
-from utils import get_logger
+from utils import Lazy, get_logger, volatile
 
 logger = get_logger('pygen-templates')
 
+STATE_VARIABLES = ('containers', 'services', 'all_containers', 'all_services', 'nodes')
+
 
 class HttpLoader(jinja2.BaseLoader):
-    def __init__(self, disable_ssl_verification):
+    # shared by every environment, so reloading a template does not download it again
+    _session = requests.Session()
+    _entries = dict()
+    _lock = threading.Lock()
+
+    def __init__(self, disable_ssl_verification, cache_directory=None, refresh_interval=0):
         self.verify_ssl = not disable_ssl_verification
+        self.cache_directory = cache_directory
+        self.refresh_interval = refresh_interval
+
+        if cache_directory and not os.path.isdir(cache_directory):
+            os.makedirs(cache_directory)
 
     def get_source(self, environment, template):
-        response = requests.get(template, verify=self.verify_ssl, timeout=60)
+        with self._lock:
+            entry = self._entries.get(template)
+
+            if entry is None or self._is_expired(entry):
+                entry = self._fetch(template, entry or self._read_cache(template))
+
+        return entry['source'], None, lambda: self._is_up_to_date(template, entry)
+
+    def _is_expired(self, entry):
+        return self.refresh_interval > 0 and time.time() - entry['checked_at'] > self.refresh_interval
+
+    def _is_up_to_date(self, template, entry):
+        with self._lock:
+            current = self._entries.get(template)
+
+            if current is not None and self._is_expired(current):
+                current = self._fetch(template, current)
+
+        return current is entry
+
+    def _fetch(self, url, entry):
+        headers = dict()
+
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self._session.get(url, headers=headers, verify=self.verify_ssl, timeout=60)
+
+        except requests.RequestException as ex:
+            response = None
+
+            if not entry:
+                raise
+
+            logger.warning('Failed to fetch the template from %s, using the cached version: %s', url, ex)
+
+        if response is not None and response.status_code == 304 and entry:
+            logger.debug('The template at %s has not changed', url)
+
+        elif response is not None and response.ok:
+            if entry and entry['source'] == response.text:
+                logger.debug('The template at %s has not changed', url)
+
+            else:
+                if entry:
+                    logger.info('The template at %s has changed', url)
+
+                entry = {
+                    'url': url,
+                    'source': response.text,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
 
-        if response.ok:
-            template_source = response.text
+                self._write_cache(entry)
 
-        else:
-            raise jinja2.TemplateNotFound(template)
+        elif response is not None and (response.status_code < 500 or not entry):
+            raise jinja2.TemplateNotFound(url)
 
-        return template_source, None, lambda: False
+        elif response is not None:
+            logger.warning('Failed to fetch the template from %s (HTTP %s), using the cached version',
+                           url, response.status_code)
+
+        entry['checked_at'] = time.time()
+
+        self._entries[url] = entry
+
+        return entry
+
+    def _cache_file(self, url):
+        return os.path.join(self.cache_directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_cache(self, url):
+        if not self.cache_directory or not os.path.exists(self._cache_file(url)):
+            return None
+
+        try:
+            with io.open(self._cache_file(url), 'r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+
+            if entry.get('url') == url:
+                return entry
+
+        except (IOError, ValueError) as ex:
+            logger.warning('Failed to read the cached template of %s: %s', url, ex)
+
+    def _write_cache(self, entry):
+        if not self.cache_directory:
+            return
+
+        try:
+            with io.open(self._cache_file(entry['url']), 'w', encoding='utf-8') as cache_file:
+                cache_file.write(six.text_type(json.dumps(dict(entry, checked_at=None))))
+
+        except IOError as ex:
+            logger.warning('Failed to cache the template of %s: %s', entry['url'], ex)
 
 
 def initialize_template(source, **kwargs):
+    jinja_environment, template_filename = create_environment(source, **kwargs)
+
+    if isinstance(jinja_environment.loader, HttpLoader):
+        logger.info('Loading Jinja2 template from: %s', template_filename)
+
+    else:
+        logger.debug('Loading Jinja2 template from: %s', template_filename)
+
+    return jinja_environment.get_template(template_filename)
+
+
+def create_environment(source, **kwargs):
     jinja_env_options = {
         'trim_blocks': True,
         'lstrip_blocks': True,
         'extensions': ['jinja2.ext.loopcontrols']
     }
 
-    log = logger.debug
+    if kwargs.get('bytecode_cache'):
+        if not os.path.isdir(kwargs['bytecode_cache']):
+            os.makedirs(kwargs['bytecode_cache'])
+
+        jinja_env_options['bytecode_cache'] = jinja2.FileSystemBytecodeCache(kwargs['bytecode_cache'])
 
     if source.startswith('#'):
         template_filename = 'inline'
 
-        jinja_environment = jinja2.Environment(loader=jinja2.DictLoader({template_filename: source[1:].strip()}),
-                                               **jinja_env_options)
+        loader = jinja2.DictLoader({template_filename: source[1:].strip()})
 
     elif re.match(r'^https?://[^.]+\..+', source, re.IGNORECASE):
         template_filename = source
 
-        jinja_environment = jinja2.Environment(loader=HttpLoader(kwargs.get('no_ssl_check', False)),
-                                               **jinja_env_options)
-
-        log = logger.info
+        loader = HttpLoader(kwargs.get('no_ssl_check', False),
+                            cache_directory=kwargs.get('http_cache'),
+                            refresh_interval=kwargs.get('template_refresh', 0))
 
     else:
         template_directory, template_filename = os.path.split(os.path.abspath(source))
 
-        jinja_environment = jinja2.Environment(loader=jinja2.FileSystemLoader(template_directory),
-                                               **jinja_env_options)
+        loader = jinja2.FileSystemLoader(template_directory)
+
+        if kwargs.get('precompiled'):
+            # templates compiled with --precompile take precedence over the source files
+            loader = jinja2.ChoiceLoader([jinja2.ModuleLoader(kwargs['precompiled']), loader])
+
+    jinja_environment = jinja2.Environment(loader=loader, **jinja_env_options)
 
     jinja_environment.filters.update({
         'any': any,
         'all': all
     })
 
-    log('Loading Jinja2 template from: %s', template_filename)
+    jinja_environment.policies['json.dumps_kwargs'] = {'sort_keys': True, 'default': Lazy.json_default}
 
-    return jinja_environment.get_template(template_filename)
+    return jinja_environment, template_filename
+
+
+def precompile_templates(target_directory, *sources):
+    for source in sources:
+        jinja_environment, template_filename = create_environment(source)
+
+        if not isinstance(jinja_environment.loader, jinja2.FileSystemLoader):
+            logger.warning('Only template files can be precompiled, skipping: %s', source)
+            continue
+
+        template_names = parse_templates(jinja_environment, template_filename)
+
+        logger.info('Precompiling %s into %s', source, target_directory)
+
+        jinja_environment.compile_templates(
+            target_directory, zip=None, ignore_errors=False,
+            filter_func=(lambda name: name in template_names) if template_names is not None else None
+        )
+
+
+def _source_loader(environment):
+    loader = environment.loader
+
+    if isinstance(loader, jinja2.ChoiceLoader):
+        # precompiled templates do not have their source available
+        loader = next((item for item in loader.loaders if item.has_source_access), None)
+
+    return loader
+
+
+def parse_templates(environment, template_name):
+    loader = _source_loader(environment)
+
+    parsed = dict()
+    pending = [template_name]
+
+    while pending:
+        name = pending.pop()
+
+        if name in parsed:
+            continue
+
+        source, _, _ = loader.get_source(environment, name)
+        parsed[name] = environment.parse(source)
+
+        for referenced in jinja2.meta.find_referenced_templates(parsed[name]):
+            if referenced is None:
+                # dynamic includes could reference any template
+                return None
+
+            pending.append(referenced)
+
+    return parsed
 
 
 def get_template_variables():
     return {
         'own_container_id': docker_helper.get_current_container_id(),
-        'read_config': docker_helper.read_configuration
+        'read_config': volatile(docker_helper.read_configuration)
     }
 
+
+def find_state_variables(template):
+    environment = getattr(template, 'environment', None)
+
+    if not environment or not environment.loader or not template.name:
+        return None
+
+    try:
+        parsed = parse_templates(environment, template.name)
+
+    except jinja2.TemplateError as ex:
+        logger.debug('Failed to analyze the template %s: %s', template.name, ex)
+        return None
+
+    if parsed is None:
+        return None
+
+    names = set()
+
+    for ast in parsed.values():
+        names.update(jinja2.meta.find_undeclared_variables(ast))
+
+    return set(name for name in names if name in STATE_VARIABLES)
+
+
+def find_template_files(template):
+    environment = getattr(template, 'environment', None)
+    loader = _source_loader(environment) if environment else None
+
+    if not isinstance(loader, jinja2.FileSystemLoader):
+        return None
+
+    parsed = parse_templates(environment, template.name)
+
+    if parsed is None:
+        # any template in the search path could be included
+        return set(), set(os.path.abspath(path) for path in loader.searchpath)
+
+    files = set()
+
+    for name in parsed:
+        _, filename, _ = loader.get_source(environment, name)
+        files.add(os.path.abspath(filename))
+
+    return files, set()
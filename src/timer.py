@@ -1,61 +1,165 @@
+import heapq
+import itertools
 import threading
 import time
+from multiprocessing.pool import ThreadPool
 
 from utils import get_logger
 
 logger = get_logger('pygen-timer')
 
 
+class ScheduledCall(object):
+    def __init__(self, due_time, function, name):
+        self.due_time = due_time
+        self.function = function
+        self.name = name
+        self.finished = threading.Event()
+
+    def cancel(self):
+        self.finished.set()
+
+
+class Scheduler(object):
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, workers=4):
+        self.workers = workers
+
+        self._condition = threading.Condition()
+        self._queue = list()
+        self._sequence = itertools.count()
+        self._thread = None
+        self._pool = None
+
+    @classmethod
+    def default(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+
+            return cls._instance
+
+    def call_later(self, delay, function, name=None):
+        call = ScheduledCall(time.time() + delay, function, name)
+
+        with self._condition:
+            # the sequence number keeps the order of calls due at the same time
+            heapq.heappush(self._queue, (call.due_time, next(self._sequence), call))
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='scheduler')
+                self._thread.daemon = True
+                self._thread.start()
+
+            self._condition.notify()
+
+        return call
+
+    def _run(self):
+        while True:
+            call = self._next_call()
+
+            if call.finished.is_set():
+                continue
+
+            call.finished.set()
+
+            if self._pool is None:
+                self._pool = ThreadPool(self.workers)
+
+            # slow calls, like the actions of a target, do not hold up the ones due after them
+            self._pool.apply_async(self._call, (call,))
+
+    @staticmethod
+    def _call(call):
+        try:
+            call.function()
+
+        except Exception as ex:
+            logger.error('Failed to run the scheduled %s: %s' % (call.name or 'call', ex), exc_info=1)
+
+    def _next_call(self):
+        with self._condition:
+            while True:
+                # cancelled calls are only dropped when they reach the top of the queue
+                while self._queue and self._queue[0][2].finished.is_set():
+                    heapq.heappop(self._queue)
+
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+
+                time_to_start = self._queue[0][0] - time.time()
+
+                if time_to_start <= 0:
+                    return heapq.heappop(self._queue)[2]
+
+                self._condition.wait(time_to_start)
+
+
 class NotificationTimer(object):
-    def __init__(self, timer_function, min_interval, max_interval):
+    def __init__(self, timer_function, min_interval, max_interval, name=None, scheduler=None):
         self.function = timer_function
         self.min_interval = min_interval
         self.max_interval = max_interval
+        self.name = name or 'notification'
+        self.scheduler = scheduler or Scheduler.default()
 
         self.timer = None
         self.due_time = -1
 
+        self._lock = threading.Lock()
+
     def schedule(self):
-        logger.debug('Scheduling a notification')
+        logger.debug('Scheduling a %s', self.name)
 
         if self.min_interval <= 0:
-            logger.debug('Sending notification immediately as interval is not greater than 0')
+            logger.debug('Sending %s immediately as interval is not greater than 0', self.name)
 
             # run the task immediately
             self.function()
             return
 
-        # when is the current Timer due to start
-        time_to_start = self.due_time - time.time()
+        with self._lock:
+            # when is the current timer due to start
+            time_to_start = self.due_time - time.time()
+
+            # if we never had a timer before
+            #   or there was and it is already finished
+            #   or the start time has already passed
+            # then just start another one
+            if self.timer is None or self.timer.finished.is_set() or time_to_start < 0:
+                logger.debug('The last %s timer started is due in %.2f seconds', self.name, time_to_start)
+
+                # it is due in max_interval seconds from now the latest
+                self.due_time = time.time() + self.max_interval
 
-        # if we never had a Timer before
-        #   or there was and it is already finished
-        #   or the start time has already passed
-        # then just start another one
-        if self.timer is None or self.timer.finished.is_set() or time_to_start < 0:
-            logger.debug('The last timer started is due in %.2f seconds', time_to_start)
+                self.timer = self.scheduler.call_later(self.min_interval, self._run, self.name)
 
-            # it is due in max_interval seconds from now the latest
-            self.due_time = time.time() + self.max_interval
+                logger.debug('Started new %s timer due in %.2f-%.2f seconds',
+                             self.name, self.min_interval, self.max_interval)
 
-            # create and start a new Timer
-            self.timer = threading.Timer(self.min_interval, self.function)
-            self.timer.start()
+            else:
+                logger.debug('Cancelling pending %s timer to start a new one', self.name)
 
-            logger.debug('Started new timer due in %.2f-%.2f seconds', self.min_interval, self.max_interval)
+                # otherwise we have a timer that has not run yet, cancel that
+                self.timer.cancel()
 
-        else:
-            logger.debug('Cancelling pending timer to start a new one')
+                # the due time does not change so the timer interval is
+                #   that time at the latest or min_interval the earliest
+                interval = min(self.min_interval, max(0, time_to_start))
 
-            # otherwise we have a Timer that has not run yet, cancel that
-            self.timer.cancel()
+                self.timer = self.scheduler.call_later(interval, self._run, self.name)
 
-            # the due time does not change so the Timer interval is
-            #   that time at the latest or min_interval the earliest
-            interval = min(self.min_interval, max(0, time_to_start))
+                logger.debug('Restarted the %s timer to run in %.2f-%.2f seconds', self.name, interval, time_to_start)
 
-            # create and start a new Timer
-            self.timer = threading.Timer(interval, self.function)
-            self.timer.start()
+    def cancel(self):
+        with self._lock:
+            if self.timer:
+                self.timer.cancel()
 
-            logger.debug('Restarted the timer to run in %.2f-%.2f seconds', interval, time_to_start)
+    def _run(self):
+        # looked up on every run so the function can be replaced
+        self.function()
@@ -1,6 +1,10 @@
 import sys
 import signal
 import logging
+import threading
+import time
+
+import six
 
 
 def initialize_logging():
@@ -33,7 +37,7 @@ def handle_signal(num, _):  # pragma: no cover
 
 def update_on_sighup(app):
     def sighup_handler(*args):
-        app.update_target()
+        app.request_update('signal')
 
     signal.signal(signal.SIGHUP, sighup_handler)
 
@@ -48,6 +52,8 @@ def setup_signals(app):
 class EnhancedDict(dict):
     default_value = None
 
+    _lowercase_keys = None
+
     def default(self, value):
         self.default_value = value
         return self
@@ -57,12 +63,50 @@ class EnhancedDict(dict):
             return self[item]
 
         elif hasattr(item, 'lower'):
-            for key in self:
-                if hasattr(key, 'lower') and key.lower() == item.lower():
-                    return self[key]
+            if self._lowercase_keys is None:
+                lowercase_keys = dict()
+
+                for key in self:
+                    if hasattr(key, 'lower'):
+                        lowercase_keys.setdefault(key.lower(), key)
+
+                self._lowercase_keys = lowercase_keys
+
+            key = self._lowercase_keys.get(item.lower())
+
+            if key is not None and key in self:
+                return self[key]
 
         return self.default_value
 
+    def __setitem__(self, key, value):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).setdefault(key, default)
+
+    def pop(self, *args):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).pop(*args)
+
+    def popitem(self):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).popitem()
+
+    def clear(self):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).clear()
+
     def __hash__(self):
         if 'raw' in self:
             return hash(self.raw)
@@ -74,6 +118,210 @@ class EnhancedDict(dict):
             raise TypeError('unhashable dict content')
 
 
+class TrackedDict(EnhancedDict):
+    def __getitem__(self, item):
+        value = super(TrackedDict, self).__getitem__(item)
+
+        tracker = DependencyTracker.current()
+
+        if tracker:
+            tracker.record_attribute(self, item, value)
+
+        return value
+
+    def __getattr__(self, item):
+        if item in self or item.startswith('__'):
+            return super(TrackedDict, self).__getattr__(item)
+
+        value = super(TrackedDict, self).__getattr__(item)
+
+        tracker = DependencyTracker.current()
+
+        if tracker:
+            tracker.record_attribute(self, item, value)
+
+        return value
+
+    def get(self, item, default=None):
+        if item in self:
+            return self[item]
+
+        return default
+
+
+class TrackedRecord(object):
+    # records provide record_id, record_items and record_value for the dependency tracker
+    __slots__ = ()
+
+
+class DependencyTracker(object):
+    _local = threading.local()
+
+    class Volatile(Exception):
+        pass
+
+    def __init__(self):
+        self.lists = dict()
+        self.attributes = dict()
+        self.volatile = False
+
+        self._previous = None
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'tracker', None)
+
+    @classmethod
+    def untracked(cls):
+        return _Untracked()
+
+    def __enter__(self):
+        self._previous = self.current()
+        self._local.tracker = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._local.tracker = self._previous
+
+    def record_list(self, name, resources):
+        if name not in self.lists:
+            self.lists[name] = self._ids(resources)
+
+    def record_attribute(self, resource, attribute, value):
+        key = (self._resource_id(resource), attribute)
+
+        if key in self.attributes or self.volatile:
+            return
+
+        try:
+            self.attributes[key] = self.snapshot(value)
+
+        except self.Volatile:
+            self.volatile = True
+
+    def mark_volatile(self):
+        self.volatile = True
+
+    def changed(self, state):
+        if self.volatile:
+            return True
+
+        index = dict()
+
+        for name, ids in self.lists.items():
+            resources = list(iter_untracked(state.get(name) or list()))
+
+            if self._ids(resources) != ids:
+                return True
+
+            self._index(resources, index)
+
+        for (resource_id, attribute), value in self.attributes.items():
+            if resource_id not in index:
+                return True
+
+            resource = index[resource_id]
+
+            try:
+                if isinstance(resource, TrackedRecord):
+                    current = self.snapshot(resource.record_value(attribute))
+
+                elif attribute in resource:
+                    current = self.snapshot(dict.__getitem__(resource, attribute))
+
+                else:
+                    current = self.snapshot(EnhancedDict.__getattr__(resource, attribute))
+
+            except self.Volatile:
+                return True
+
+            if current != value:
+                return True
+
+        return False
+
+    @staticmethod
+    def _resource_id(resource):
+        if isinstance(resource, TrackedRecord):
+            return resource.record_id()
+
+        elif isinstance(resource, dict):
+            return dict.get(resource, 'id')
+
+        else:
+            return id(resource)
+
+    @classmethod
+    def _ids(cls, resources):
+        return tuple(cls._resource_id(resource) for resource in iter_untracked(resources))
+
+    @classmethod
+    def _index(cls, resources, index):
+        for resource in resources:
+            if isinstance(resource, TrackedDict):
+                values = dict.values(resource)
+
+            elif isinstance(resource, TrackedRecord):
+                values = [value for _, value in resource.record_items()]
+
+            else:
+                continue
+
+            index[cls._resource_id(resource)] = resource
+
+            for value in values:
+                if isinstance(value, list):
+                    cls._index(value, index)
+
+    @classmethod
+    def snapshot(cls, value):
+        if isinstance(value, dict):
+            return tuple(sorted((key, cls.snapshot(item)) for key, item in dict.items(value) if key != 'raw'))
+
+        elif isinstance(value, TrackedRecord):
+            return tuple(sorted((key, cls.snapshot(item)) for key, item in value.record_items()))
+
+        elif isinstance(value, (list, tuple)):
+            return tuple(cls.snapshot(item) for item in iter_untracked(value))
+
+        elif value is None or isinstance(value, six.string_types + six.integer_types + (float, bool)):
+            return value
+
+        else:
+            raise cls.Volatile()
+
+
+class _Untracked(object):
+    def __init__(self):
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = DependencyTracker.current()
+        DependencyTracker._local.tracker = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        DependencyTracker._local.tracker = self._previous
+
+
+def iter_untracked(items):
+    if isinstance(items, list):
+        return list.__iter__(items)
+
+    return iter(items)
+
+
+def volatile(function):
+    def wrapper(*args, **kwargs):
+        tracker = DependencyTracker.current()
+
+        if tracker:
+            tracker.mark_volatile()
+
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
 class EnhancedList(list):
     @property
     def first(self):
@@ -93,19 +341,42 @@ class EnhancedList(list):
 
 
 class Lazy(object):
+    _unset = object()
+
     def __init__(self, delegate, *args, **kwargs):
         self.__delegate = delegate
         self.__args = args
         self.__kwargs = kwargs
+        self.__lock = threading.Lock()
+
+        self._value = self._unset
+        self._loaded_at = 0
+        self._ttl = 0
+
+    def expire_after(self, seconds):
+        self._ttl = seconds
+        return self
 
-        self._value = None
+    def invalidate(self):
+        self._value = self._unset
+
+    def _is_expired(self):
+        return self._value is self._unset or (self._ttl and time.time() - self._loaded_at > self._ttl)
 
     @property
     def __value(self):
-        if self._value is None:
-            self._value = self.__delegate(*self.__args, **self.__kwargs)
+        value = self._value
+
+        if self._is_expired():
+            with self.__lock:
+                value = self._value
+
+                if self._is_expired():
+                    value = self.__delegate(*self.__args, **self.__kwargs)
+
+                    self._value, self._loaded_at = value, time.time()
 
-        return self._value
+        return value
 
     def __getattr__(self, name):
         return getattr(self.__value, name)
@@ -122,9 +393,37 @@ class Lazy(object):
     def __len__(self):
         return len(self.__value)
 
+    def __contains__(self, item):
+        return item in self.__value
+
+    def __bool__(self):
+        return bool(self.__value)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        return self.__value == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __add__(self, other):
+        return self.__value + other
+
+    def __radd__(self, other):
+        return other + self.__value
+
     def __hash__(self):
         return hash(self.__value)
 
     def __str__(self):
         return str(self.__value)
 
+    @staticmethod
+    def json_default(value):
+        # lets the tojson filter serialize the loaded values
+        if isinstance(value, Lazy):
+            return value.__value
+
+        raise TypeError('%r is not JSON serializable' % value)
+
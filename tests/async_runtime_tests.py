@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from async_runtime import AsyncDockerClient, AsyncRenderQueue, AsyncRuntime, AsyncWorkerRuntime, LoopScheduler, \
+    unix_socket_path
+from errors import PyGenException
+from fakes import Namespace
+from models import ContainerInfo
+from utils import EnhancedDict
+
+
+class AsyncRuntimeTest(unittest.TestCase):
+    CONTAINERS = [
+        {'Id': 'c1', 'Names': ['/web'], 'Image': 'nginx', 'Labels': {}, 'State': 'running',
+         'Status': 'Up 1 minute (healthy)', 'NetworkSettings': {'Networks': {}}, 'Ports': []}
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'docker.sock')
+        self.requests = list()
+
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_unix_server(self.handle, self.socket_path))
+
+        self.client = AsyncDockerClient(self.socket_path, '1.30')
+
+    def tearDown(self):
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+        shutil.rmtree(self.directory)
+
+    async def handle(self, reader, writer):
+        path = (await reader.readline()).split()[1].decode('ascii')
+
+        while (await reader.readline()).strip():
+            pass
+
+        self.requests.append(path)
+
+        if path.startswith('/v1.30/containers/json'):
+            content = json.dumps(self.CONTAINERS).encode('utf-8')
+
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: %d\r\n\r\n' % len(content) + content)
+
+        elif path.startswith('/v1.30/events'):
+            writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+
+            # the second event is split between chunks
+            for chunk in (b'{"status": "start", "id": "c1"}\n{"status": ', b'"die", "id": "c2"}\n'):
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+
+            writer.write(b'0\r\n\r\n')
+
+        else:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 9\r\n\r\nnot found')
+
+        await writer.drain()
+        writer.close()
+
+    def test_get_json(self):
+        containers = self.loop.run_until_complete(self.client.containers(all=True))
+
+        self.assertEqual(containers, self.CONTAINERS)
+        self.assertEqual(self.requests, ['/v1.30/containers/json?all=1'])
+
+    def test_api_error(self):
+        with self.assertRaises(PyGenException):
+            self.loop.run_until_complete(self.client.services())
+
+    def test_events(self):
+        async def read_events():
+            return [event async for event in self.client.events(filters={'event': ['start', 'die']})]
+
+        events = self.loop.run_until_complete(read_events())
+
+        self.assertEqual(events, [{'status': 'start', 'id': 'c1'}, {'status': 'die', 'id': 'c2'}])
+        self.assertTrue(self.requests[0].startswith('/v1.30/events?filters='))
+
+    def test_fetch_state(self):
+        api = Namespace(state=EnhancedDict(), state_cache=None,
+                        container_model=ContainerInfo, inspect_container=lambda container_id: None)
+        app = Namespace(api=api, state_variables={'containers'})
+
+        runtime = AsyncRuntime(app, loop=self.loop, client=self.client)
+
+        state = self.loop.run_until_complete(runtime.fetch_state())
+
+        self.assertEqual(state['containers'].state_name, 'containers')
+        self.assertEqual(state['containers'].first.name, 'web')
+        self.assertEqual(state['containers'].first.health, 'healthy')
+        self.assertNotIn('services', state)
+
+    def test_render_queue_coalesces_requests(self):
+        updates = list()
+
+        class FakeRuntime(object):
+            loop = self.loop
+
+            @staticmethod
+            async def update(allow_repeat=False):
+                updates.append(allow_repeat)
+
+        queue = AsyncRenderQueue(FakeRuntime())
+
+        for _ in range(5):
+            queue.request('test')
+
+        queue.request('test', allow_repeat=True)
+
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+
+        self.assertEqual(updates, [True])
+
+    def test_loop_scheduler(self):
+        calls = list()
+
+        scheduler = LoopScheduler(self.loop)
+
+        scheduler.call_later(0.05, lambda: calls.append('scheduled'))
+        scheduler.call_later(0.05, lambda: calls.append('cancelled')).cancel()
+
+        self.loop.run_until_complete(asyncio.sleep(0.3))
+
+        self.assertEqual(calls, ['scheduled'])
+
+    def test_worker_retries(self):
+        posts = list()
+
+        async def handle(reader, writer):
+            while (await reader.readline()).strip():
+                pass
+
+            posts.append(self.loop.time())
+
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n')
+
+            await writer.drain()
+            writer.close()
+
+        server = self.loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0))
+        port = server.sockets[0].getsockname()[1]
+
+        worker = Namespace(managers=['127.0.0.1'], manager_port=port, retries=2, retry_delay=0.1)
+
+        try:
+            runtime = AsyncWorkerRuntime(worker, loop=self.loop, client=self.client)
+
+            self.loop.run_until_complete(runtime.send_update('start'))
+
+        finally:
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+
+        self.assertEqual(len(posts), 3)
+        self.assertGreaterEqual(posts[1] - posts[0], 0.1)
+        self.assertGreaterEqual(posts[2] - posts[1], 0.2)
+
+    def test_unix_socket_path(self):
+        self.assertEqual(unix_socket_path('unix:///var/run/docker.sock'), '/var/run/docker.sock')
+
+        with self.assertRaises(PyGenException):
+            unix_socket_path('tcp://localhost:2375')
@@ -0,0 +1,33 @@
+class Namespace(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeContainer(object):
+    def __init__(self, container_id, name=None, running=True, labels=None, env=None, image='alpine'):
+        self.id = container_id
+        self.short_id = container_id[:12]
+        self.name = name or 'c-%s' % container_id
+        self.status = 'running' if running else 'exited'
+        self.labels = labels or dict()
+        self.attrs = {
+            'Config': {'Image': image, 'Env': env or [], 'ExposedPorts': {'80/tcp': {}}},
+            'State': {'Running': running, 'Health': {'Status': 'healthy'}},
+            'NetworkSettings': {'Networks': {'default': {'NetworkID': 'n1', 'IPAddress': '10.0.0.2'}}}
+        }
+        self.collection = Namespace(get=lambda container_id: 'fetched-%s' % container_id)
+
+
+class FakeService(object):
+    def __init__(self, service_id, name):
+        self.id = service_id
+        self.short_id = service_id[:10]
+        self.name = name
+        self.attrs = {
+            'Version': {'Index': 12},
+            'Spec': {'TaskTemplate': {'ContainerSpec': {'Image': 'nginx'}},
+                     'Labels': {'com.docker.stack.namespace': 'stack'}},
+            'Endpoint': {}
+        }
+        self.client = Namespace(api=Namespace(inspect_task=lambda task_id: {'ID': task_id}))
+        self.collection = Namespace(get=lambda service_id: 'fetched-%s' % service_id)
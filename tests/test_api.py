@@ -0,0 +1,121 @@
+import time
+import unittest
+
+import api
+from fakes import Namespace
+
+
+class FakeService(object):
+    def __init__(self, service_id):
+        self.id = service_id
+
+    def tasks(self, filters=None):
+        # like docker-py, the service ID is added to the filters given
+        if filters is None:
+            filters = dict()
+
+        filters['service'] = self.id
+
+        # lets the other threads change a shared dict in the meantime
+        time.sleep(0.05)
+
+        return [{'ID': 't-%s' % filters['service'], 'ServiceID': filters['service']}]
+
+
+class FakeSwarm(object):
+    def __init__(self):
+        self.reads = 0
+        self.joined = True
+
+    @property
+    def attrs(self):
+        self.reads += 1
+
+        return {'ID': 'swarm-id'} if self.joined else dict()
+
+
+class DockerApiTest(unittest.TestCase):
+    def setUp(self):
+        self.task_calls = list()
+
+        def tasks(filters=None):
+            self.task_calls.append(filters)
+
+            return [{'ID': 't1', 'ServiceID': 's1'}, {'ID': 't2', 'ServiceID': 's2'},
+                    {'ID': 't3', 'ServiceID': 's1'}, {'ID': 't4', 'ServiceID': 'unknown'}]
+
+        self.swarm = FakeSwarm()
+        self.client = Namespace(api=Namespace(api_version='1.30', tasks=tasks, close=lambda: None), swarm=self.swarm)
+
+        self.original_client = api.docker.DockerClient
+        api.docker.DockerClient = lambda *args, **kwargs: self.client
+
+    def tearDown(self):
+        api.docker.DockerClient = self.original_client
+
+    def test_tasks_with_a_single_call(self):
+        docker_api = api.DockerApi()
+
+        services = [Namespace(id='s1'), Namespace(id='s2'), Namespace(id='s3')]
+
+        tasks = docker_api._tasks(services, 'running')
+
+        self.assertEqual(self.task_calls, [{'desired-state': 'running'}])
+        self.assertEqual([task['ID'] for task in tasks['s1']], ['t1', 't3'])
+        self.assertEqual([task['ID'] for task in tasks['s2']], ['t2'])
+        self.assertEqual(tasks['s3'], [])
+
+    def test_tasks_on_worker_threads(self):
+        docker_api = api.DockerApi(task_workers=4)
+
+        services = [FakeService('s%d' % idx) for idx in range(8)]
+
+        try:
+            tasks = docker_api._tasks(services, 'running')
+
+        finally:
+            docker_api.close()
+
+        self.assertEqual(self.task_calls, [])
+
+        for service in services:
+            self.assertEqual([task['ServiceID'] for task in tasks[service.id]], [service.id])
+
+    def test_swarm_mode_is_cached(self):
+        docker_api = api.DockerApi(swarm_mode_ttl=30)
+
+        self.assertTrue(docker_api.is_swarm_mode)
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        self.swarm.joined = False
+
+        self.assertTrue(docker_api.is_swarm_mode)
+        self.assertEqual(self.swarm.reads, 1)
+
+    def test_swarm_mode_expires(self):
+        docker_api = api.DockerApi(swarm_mode_ttl=0.05)
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        self.swarm.joined = False
+
+        time.sleep(0.1)
+
+        self.assertFalse(docker_api.is_swarm_mode)
+        self.assertEqual(self.swarm.reads, 2)
+
+    def test_swarm_mode_invalidated_by_node_events(self):
+        docker_api = api.DockerApi(swarm_mode_ttl=30)
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        self.swarm.joined = False
+
+        docker_api.process_event({'Type': 'container', 'Action': 'start', 'Actor': {'ID': 'c1'}})
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        docker_api.process_event({'Type': 'node', 'Action': 'update', 'Actor': {'ID': 'n1'}})
+
+        self.assertFalse(docker_api.is_swarm_mode)
+        self.assertEqual(self.swarm.reads, 2)
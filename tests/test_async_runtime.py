@@ -0,0 +1,12 @@
+import sys
+import unittest
+
+if sys.version_info >= (3, 6):
+    # the tests use async generators and comprehensions, older versions can not compile them
+    from async_runtime_tests import AsyncRuntimeTest
+
+else:
+    @unittest.skip('the asyncio runtime needs Python 3.6 or newer')
+    class AsyncRuntimeTest(unittest.TestCase):
+        def test_skipped(self):
+            pass
@@ -88,3 +88,121 @@ class CliTest(unittest.TestCase):
         self.assertEqual(args.events, ['start', 'stop'])
         self.assertFalse(args.debug)
 
+
+    def test_state_cache_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.state_cache, 0)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--state-cache'])
+
+        self.assertEqual(args.state_cache, 60)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--state-cache', '15'])
+
+        self.assertEqual(args.state_cache, 15)
+
+    def test_task_workers_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.task_workers, 0)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--task-workers', '8'])
+
+        self.assertEqual(args.task_workers, 8)
+
+    def test_watch_labels_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.watch_labels, [])
+
+        args = cli.parse_arguments(['--template', 'test.template', '--watch-labels', 'pygen.watch=true', 'env'])
+
+        self.assertEqual(args.watch_labels, ['pygen.watch=true', 'env'])
+
+        args = swarm_worker.parse_arguments(['--manager', 'manager-host', '--watch-labels', 'pygen.watch'])
+
+        self.assertEqual(args.watch_labels, ['pygen.watch'])
+
+    def test_output_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.output, [])
+
+        args = cli.parse_arguments(['--template', 'test.template',
+                                    '--output', 'second.template', '/etc/second.conf', 'signal=nginx:HUP',
+                                    '--output', 'third.template', '/etc/third.conf'])
+
+        self.assertEqual(args.output, [['second.template', '/etc/second.conf', 'signal=nginx:HUP'],
+                                       ['third.template', '/etc/third.conf']])
+
+    def test_track_dependencies_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertFalse(args.track_dependencies)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--track-dependencies'])
+
+        self.assertTrue(args.track_dependencies)
+
+    def test_compact_models_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertFalse(args.compact_models)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--compact-models'])
+
+        self.assertTrue(args.compact_models)
+
+    def test_state_ttl_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.state_ttl, 0)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--state-ttl', '2.5'])
+
+        self.assertEqual(args.state_ttl, 2.5)
+
+    def test_template_cache_arguments(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertIsNone(args.bytecode_cache)
+        self.assertIsNone(args.precompiled)
+        self.assertIsNone(args.precompile)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--bytecode-cache', '/tmp/cache',
+                                    '--precompiled', '/app/compiled', '--precompile', '/build/compiled'])
+
+        self.assertEqual(args.bytecode_cache, '/tmp/cache')
+        self.assertEqual(args.precompiled, '/app/compiled')
+        self.assertEqual(args.precompile, '/build/compiled')
+
+    def test_template_refresh_arguments(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertIsNone(args.template_cache)
+        self.assertEqual(args.template_refresh, 0)
+
+        args = cli.parse_arguments(['--template', 'http://templates.local/test.template',
+                                    '--template-cache', '/var/cache/pygen', '--template-refresh', '30'])
+
+        self.assertEqual(args.template_cache, '/var/cache/pygen')
+        self.assertEqual(args.template_refresh, 30)
+
+    def test_watch_templates_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertFalse(args.watch_templates)
+
+        args = cli.parse_arguments(['--template', 'test.template', '--watch-templates'])
+
+        self.assertTrue(args.watch_templates)
+
+    def test_runtime_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template'])
+
+        self.assertEqual(args.runtime, 'threads')
+
+        args = cli.parse_arguments(['--template', 'test.template', '--runtime', 'asyncio'])
+
+        self.assertEqual(args.runtime, 'asyncio')
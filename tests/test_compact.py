@@ -0,0 +1,98 @@
+import unittest
+
+import jinja2
+
+from compact import CompactContainerInfo, CompactServiceInfo, FrozenDict
+from fakes import FakeContainer, FakeService
+from models import ContainerInfo
+from resources import ContainerList
+from utils import DependencyTracker
+
+
+class CompactModelsTest(unittest.TestCase):
+    def test_container_fields(self):
+        container = CompactContainerInfo(FakeContainer('c0123456789abcdef', 'web',
+                                                       labels={'pygen.target': 'web-target'},
+                                                       env=['PORT=8080']))
+
+        self.assertEqual(container.id, 'c0123456789abcdef')
+        self.assertEqual(container.short_id, 'c0123456789a')
+        self.assertEqual(container.name, 'web')
+        self.assertEqual(container['name'], 'web')
+        self.assertEqual(container.Name, 'web')
+        self.assertEqual(container.health, 'healthy')
+        self.assertEqual(container.labels['pygen.target'], 'web-target')
+        self.assertEqual(container.labels.missing, '')
+        self.assertEqual(container.env.port, '8080')
+        self.assertEqual(container.ports.tcp, [80])
+        self.assertEqual(container.networks.first.ip_address, '10.0.0.2')
+        self.assertIsNone(container.unknown)
+        self.assertIsNone(container.get('unknown'))
+        self.assertIn('name', container)
+        self.assertRaises(KeyError, lambda: container['unknown'])
+
+    def test_compatible_with_models(self):
+        source = FakeContainer('c01', 'web', labels={'com.docker.compose.service': 'app'})
+
+        compact, model = CompactContainerInfo(source), ContainerInfo(source)
+
+        for field in compact:
+            self.assertEqual(compact[field], model[field])
+
+        self.assertEqual(compact, model)
+        self.assertEqual(hash(compact), hash(CompactContainerInfo(source)))
+        self.assertEqual(len(ContainerList([compact]).matching('app')), 1)
+
+    def test_raw_is_loaded_on_demand(self):
+        container = CompactContainerInfo(FakeContainer('c01', 'web'))
+
+        self.assertIsNone(container._raw)
+        self.assertEqual(container.raw, 'fetched-c01')
+        self.assertEqual(container['raw'], 'fetched-c01')
+
+    def test_shared_read_only_maps(self):
+        first = CompactContainerInfo(FakeContainer('c01', 'first'))
+        second = CompactContainerInfo(FakeContainer('c02', 'second'))
+
+        self.assertIs(first.labels, second.labels)
+        self.assertIs(first.env, second.env)
+        self.assertIsInstance(first.labels, FrozenDict)
+
+        def modify():
+            first.labels['x'] = 'y'
+
+        self.assertRaises(TypeError, modify)
+        self.assertRaises(TypeError, first.labels.update, x='y')
+        self.assertRaises(AttributeError, setattr, first, 'name', 'changed')
+
+    def test_service_tasks(self):
+        task = {
+            'ID': 't01', 'ServiceID': 's01', 'Slot': 1, 'NodeID': 'n01', 'DesiredState': 'running',
+            'Status': {'State': 'running', 'ContainerStatus': {'ContainerID': 'c01'}},
+            'Spec': {'ContainerSpec': {'Image': 'nginx'}}
+        }
+
+        service = CompactServiceInfo(FakeService('s01', 'stack_web'), raw_tasks=[task])
+
+        self.assertEqual(service.version, 12)
+        self.assertEqual(service.tasks.first.name, 'stack_web.1.t01')
+        self.assertEqual(service.tasks.first.labels['com.docker.swarm.service.name'], 'stack_web')
+        self.assertEqual(service.tasks.first.raw, {'ID': 't01'})
+        self.assertEqual(service.tasks.matching('c01').first.id, 't01')
+        self.assertEqual(service.raw, 'fetched-s01')
+
+    def test_dependency_tracking(self):
+        def containers(name):
+            resources = ContainerList([CompactContainerInfo(FakeContainer('c01', name))])
+            resources.state_name = 'containers'
+            return resources
+
+        tracker = DependencyTracker()
+
+        with tracker:
+            content = jinja2.Template('{% for c in containers %}{{ c.name }}{% endfor %}').render(
+                containers=containers('web'))
+
+        self.assertEqual(content, 'web')
+        self.assertFalse(tracker.changed({'containers': containers('web')}))
+        self.assertTrue(tracker.changed({'containers': containers('db')}))
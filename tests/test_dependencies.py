@@ -0,0 +1,105 @@
+import unittest
+
+import jinja2
+
+from resources import ResourceList
+from utils import TrackedDict, DependencyTracker, Lazy, volatile
+
+
+class DependencyTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.template = jinja2.Template('{% for c in containers %}{{ c.name }} {% endfor %}')
+
+    @staticmethod
+    def resources(*items):
+        resources = ResourceList(TrackedDict(item) for item in items)
+        resources.state_name = 'containers'
+        return resources
+
+    def render(self, state, template=None):
+        tracker = DependencyTracker()
+
+        with tracker:
+            content = (template or self.template).render(**state)
+
+        return tracker, content
+
+    def test_unchanged_state(self):
+        tracker, content = self.render({'containers': self.resources({'id': 'c1', 'name': 'one', 'image': 'x'})})
+
+        self.assertEqual('one ', content)
+        self.assertFalse(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'one', 'image': 'x'})}))
+
+    def test_unused_attribute_changed(self):
+        tracker, _ = self.render({'containers': self.resources({'id': 'c1', 'name': 'one', 'image': 'x'})})
+
+        self.assertFalse(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'one', 'image': 'y'})}))
+
+    def test_used_attribute_changed(self):
+        tracker, _ = self.render({'containers': self.resources({'id': 'c1', 'name': 'one'})})
+
+        self.assertTrue(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'two'})}))
+
+    def test_list_changed(self):
+        tracker, _ = self.render({'containers': self.resources({'id': 'c1', 'name': 'one'})})
+
+        self.assertTrue(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'one'},
+                                                                      {'id': 'c2', 'name': 'two'})}))
+        self.assertTrue(tracker.changed({'containers': self.resources()}))
+
+    def test_unused_list_changed(self):
+        template = jinja2.Template('static')
+
+        tracker, _ = self.render({'containers': self.resources({'id': 'c1'})}, template)
+
+        self.assertFalse(tracker.changed({'containers': self.resources({'id': 'c2'})}))
+
+    def test_nested_attribute_changed(self):
+        template = jinja2.Template('{% for c in containers %}{{ c.labels.port }}{% endfor %}')
+
+        tracker, content = self.render({'containers': self.resources({'id': 'c1', 'labels': {'port': '80'}})},
+                                       template)
+
+        self.assertEqual('80', content)
+        self.assertFalse(tracker.changed({'containers': self.resources({'id': 'c1', 'labels': {'port': '80'}})}))
+        self.assertTrue(tracker.changed({'containers': self.resources({'id': 'c1', 'labels': {'port': '81'}})}))
+
+    def test_lazy_state(self):
+        state = {'containers': Lazy(self.resources, {'id': 'c1', 'name': 'one'})}
+
+        tracker, content = self.render(state)
+
+        self.assertEqual('one ', content)
+        self.assertFalse(tracker.changed({'containers': Lazy(self.resources, {'id': 'c1', 'name': 'one'})}))
+        self.assertTrue(tracker.changed({'containers': Lazy(self.resources, {'id': 'c1', 'name': 'two'})}))
+
+    def test_matching_with_cached_index(self):
+        template = jinja2.Template('{{ containers.matching("web")|length }}')
+
+        containers = self.resources({'id': 'c1', 'name': 'web'}, {'id': 'c2', 'name': 'db'})
+        containers.matching('web')
+
+        tracker, content = self.render({'containers': containers}, template)
+
+        self.assertEqual('1', content)
+        self.assertFalse(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'web'},
+                                                                       {'id': 'c2', 'name': 'db'})}))
+        self.assertTrue(tracker.changed({'containers': self.resources({'id': 'c1', 'name': 'web'},
+                                                                      {'id': 'c2', 'name': 'web'})}))
+
+    def test_volatile_function(self):
+        template = jinja2.Template('{{ read() }}')
+
+        tracker, content = self.render({'read': volatile(lambda: 'x')}, template)
+
+        self.assertEqual('x', content)
+        self.assertTrue(tracker.volatile)
+        self.assertTrue(tracker.changed(dict()))
+
+    def test_no_tracking_outside_context(self):
+        tracker = DependencyTracker()
+
+        self.template.render(containers=self.resources({'id': 'c1', 'name': 'one'}))
+
+        self.assertEqual(dict(), tracker.lists)
+        self.assertEqual(dict(), tracker.attributes)
@@ -0,0 +1,46 @@
+import unittest
+
+from utils import EnhancedDict
+
+
+class EnhancedDictTest(unittest.TestCase):
+    def test_case_insensitive_access(self):
+        values = EnhancedDict({'Name': 'first', 'PYGEN_TARGET': 'target', 1: 'number'}).default('')
+
+        self.assertEqual(values.name, 'first')
+        self.assertEqual(values.NAME, 'first')
+        self.assertEqual(values.pygen_target, 'target')
+        self.assertEqual(values.missing, '')
+
+    def test_exact_key_wins(self):
+        values = EnhancedDict({'KEY': 'upper', 'key': 'lower'})
+
+        self.assertEqual(values.key, 'lower')
+        self.assertEqual(values.KEY, 'upper')
+
+    def test_lookup_follows_changes(self):
+        values = EnhancedDict(Name='first')
+
+        self.assertIsNone(values.other)
+
+        values['Other'] = 'added'
+
+        self.assertEqual(values.other, 'added')
+
+        del values['Name']
+
+        self.assertIsNone(values.name)
+
+        values.update(NAME='updated')
+
+        self.assertEqual(values.name, 'updated')
+
+        values.pop('NAME')
+        values.setdefault('nAmE', 'default')
+
+        self.assertEqual(values.name, 'default')
+
+        values.clear()
+
+        self.assertIsNone(values.other)
+        self.assertIsNone(values.name)
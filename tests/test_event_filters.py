@@ -0,0 +1,59 @@
+import unittest
+
+import api
+from fakes import Namespace
+
+
+class EventFiltersTest(unittest.TestCase):
+    def setUp(self):
+        self.api_version = '1.30'
+
+        self.original_client = api.docker.DockerClient
+        api.docker.DockerClient = lambda *args, **kwargs: Namespace(api=Namespace(api_version=self.api_version))
+
+    def tearDown(self):
+        api.docker.DockerClient = self.original_client
+
+    def test_adds_node_events_when_services_are_watched(self):
+        filters = api.DockerApi().event_filters({'event': ['start', 'health_status'],
+                                                 'type': ['container', 'service']})
+
+        self.assertEqual(filters['event'], ['start', 'health_status', 'create', 'update', 'remove'])
+        self.assertEqual(filters['type'], ['container', 'service', 'node'])
+
+    def test_keeps_container_filters(self):
+        filters = api.DockerApi().event_filters({'event': ['start'], 'type': ['container']})
+
+        self.assertEqual(filters, {'event': ['start'], 'type': ['container']})
+
+    def test_keeps_label_filters(self):
+        filters = api.DockerApi(state_ttl=10).event_filters({'event': ['start'], 'type': ['container', 'service'],
+                                                             'label': ['pygen.watch']})
+
+        self.assertEqual(filters, {'event': ['start'], 'type': ['container', 'service'], 'label': ['pygen.watch']})
+
+    def test_adds_node_events_without_type_filter(self):
+        filters = api.DockerApi().event_filters({'event': ['start', 'connect']})
+
+        self.assertEqual(filters, {'event': ['start', 'connect', 'create', 'update', 'remove']})
+
+    def test_adds_node_events_for_shared_state(self):
+        filters = api.DockerApi(state_ttl=10).event_filters({'event': ['start'], 'type': ['container']})
+
+        self.assertEqual(filters['type'], ['container', 'node'])
+
+    def test_health_status_on_old_daemons(self):
+        self.api_version = '1.24'
+
+        filters = api.DockerApi().event_filters({'event': ['health_status'], 'type': ['container']})
+
+        self.assertEqual(filters['event'], ['health_status', 'health_status: starting',
+                                            'health_status: healthy', 'health_status: unhealthy'])
+
+    def test_event_arguments_with_state_cache(self):
+        docker_api = api.DockerApi(state_cache=60)
+
+        filters = docker_api.event_arguments(filters={'event': ['start'], 'type': ['container', 'service']})['filters']
+
+        self.assertIn('destroy', filters['event'])
+        self.assertIn('node', filters['type'])
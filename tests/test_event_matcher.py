@@ -0,0 +1,78 @@
+import unittest
+
+from event_matcher import EventMatcher
+
+
+class EventMatcherTest(unittest.TestCase):
+    def test_match_by_status(self):
+        matcher = EventMatcher(['start', 'stop'])
+
+        self.assertTrue(matcher.matches({'status': 'start'}))
+        self.assertTrue(matcher.matches({'status': 'stop'}))
+        self.assertFalse(matcher.matches({'status': 'die'}))
+        self.assertFalse(matcher.matches({'status': 'restart'}))
+        self.assertFalse(matcher.matches({}))
+
+    def test_match_by_action(self):
+        matcher = EventMatcher(['start', 'die'])
+
+        self.assertTrue(matcher.matches({'Type': 'container', 'Action': 'die'}))
+        self.assertFalse(matcher.matches({'Type': 'container', 'Action': 'exec_start: sh'}))
+
+    def test_match_health_status(self):
+        matcher = EventMatcher(['health_status'])
+
+        self.assertTrue(matcher.matches({'status': 'health_status: healthy'}))
+        self.assertTrue(matcher.matches({'status': 'health_status'}))
+        self.assertFalse(matcher.matches({'status': 'health_status:'}))
+        self.assertFalse(matcher.matches({'status': 'health'}))
+
+    def test_match_by_type(self):
+        matcher = EventMatcher(['update'], types=['service'])
+
+        self.assertTrue(matcher.matches({'Type': 'service', 'Action': 'update'}))
+        self.assertFalse(matcher.matches({'Type': 'container', 'Action': 'update'}))
+        self.assertFalse(matcher.matches({'status': 'update'}))
+
+    def test_other_event_types(self):
+        matcher = EventMatcher(['start', 'connect'], types=['container', 'service'])
+
+        self.assertEqual(matcher.types, [])
+        self.assertNotIn('type', matcher.filters)
+        self.assertTrue(matcher.matches({'Type': 'network', 'Action': 'connect'}))
+        self.assertTrue(matcher.matches({'Type': 'container', 'Action': 'start'}))
+
+        matcher = EventMatcher(['start', 'update'], types=['container', 'service'])
+
+        self.assertEqual(matcher.types, ['container', 'service'])
+        self.assertFalse(matcher.matches({'Type': 'network', 'Action': 'start'}))
+
+    def test_match_by_label(self):
+        matcher = EventMatcher(['start'], labels=['pygen.watch', 'env=prod'])
+
+        self.assertTrue(matcher.matches({'status': 'start', 'Actor': {'Attributes': {
+            'pygen.watch': 'true', 'env': 'prod'
+        }}}))
+        self.assertFalse(matcher.matches({'status': 'start', 'Actor': {'Attributes': {
+            'pygen.watch': 'true', 'env': 'test'
+        }}}))
+        self.assertFalse(matcher.matches({'status': 'start', 'Actor': {'Attributes': {'env': 'prod'}}}))
+        self.assertFalse(matcher.matches({'status': 'start'}))
+
+    def test_special_characters(self):
+        matcher = EventMatcher(['exec_start.*'])
+
+        self.assertTrue(matcher.matches({'status': 'exec_start.*'}))
+        self.assertFalse(matcher.matches({'status': 'exec_start: sh'}))
+
+    def test_filters(self):
+        self.assertEqual(EventMatcher(['start', 'die']).filters, {'event': ['start', 'die']})
+        self.assertEqual(EventMatcher([]).filters, {})
+
+        matcher = EventMatcher(['start'], types=['container'], labels=['pygen.watch=true'])
+
+        self.assertEqual(matcher.filters, {
+            'event': ['start'],
+            'type': ['container'],
+            'label': ['pygen.watch=true']
+        })
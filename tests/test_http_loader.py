@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import jinja2
+from six.moves import BaseHTTPServer
+
+from templates import HttpLoader, initialize_template
+
+
+class TemplateHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+
+        if server.template is None:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        etag = '"%d"' % server.version
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = server.template.encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpLoaderTest(unittest.TestCase):
+    def setUp(self):
+        HttpLoader._entries.clear()
+
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), TemplateHandler)
+        self.server.template = 'Hello {{ name }}!'
+        self.server.version = 1
+        self.server.requests = list()
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+        self.url = 'http://localhost:%d/template.j2' % self.server.server_address[1]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        shutil.rmtree(self.directory)
+
+    def update_template(self, template):
+        self.server.template = template
+        self.server.version += 1
+
+    def test_loads_template_once(self):
+        template = initialize_template(self.url)
+
+        self.assertEqual(template.render(name='HTTP'), 'Hello HTTP!')
+
+        template = initialize_template(self.url)
+
+        self.assertEqual(template.render(name='again'), 'Hello again!')
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(template.is_up_to_date)
+
+    def test_conditional_revalidation(self):
+        template = initialize_template(self.url, template_refresh=0.1)
+
+        time.sleep(0.15)
+
+        self.assertTrue(template.is_up_to_date)
+        self.assertEqual(self.server.requests[-1].get('If-None-Match'), '"1"')
+
+        self.update_template('Changed {{ name }}')
+
+        time.sleep(0.15)
+
+        self.assertFalse(template.is_up_to_date)
+
+        template = template.environment.get_template(template.name)
+
+        self.assertEqual(template.render(name='template'), 'Changed template')
+        self.assertTrue(template.is_up_to_date)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_disk_cache(self):
+        cache = os.path.join(self.directory, 'cache')
+
+        initialize_template(self.url, http_cache=cache)
+
+        self.assertEqual(len(os.listdir(cache)), 1)
+
+        HttpLoader._entries.clear()
+
+        template = initialize_template(self.url, http_cache=cache)
+
+        self.assertEqual(template.render(name='cache'), 'Hello cache!')
+        self.assertEqual(self.server.requests[-1].get('If-None-Match'), '"1"')
+
+    def test_fallback_to_disk_cache(self):
+        cache = os.path.join(self.directory, 'cache')
+
+        initialize_template(self.url, http_cache=cache)
+
+        HttpLoader._entries.clear()
+        self.server.template = None
+
+        template = initialize_template(self.url, http_cache=cache)
+
+        self.assertEqual(template.render(name='fallback'), 'Hello fallback!')
+
+    def test_missing_template(self):
+        self.server.template = None
+
+        self.assertRaises(jinja2.TemplateNotFound, initialize_template, self.url)
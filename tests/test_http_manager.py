@@ -13,7 +13,7 @@ class HttpManagerTest(unittest.TestCase):
 
         self.app = pygen.PyGen(template='#', swarm_manager=True)
 
-        def counting_generate():
+        def counting_generate(target):
             self.generate_count += 1
             return 'Generated %d times' % self.generate_count
 
@@ -0,0 +1,156 @@
+import socket
+import threading
+import unittest
+
+import six
+from six.moves import http_client
+
+from http_server import HttpServer
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('localhost', 0))
+
+    port = sock.getsockname()[1]
+
+    sock.close()
+
+    return port
+
+
+class BlockingServer(HttpServer):
+    def __init__(self, port, pool_size=4, queue_size=32):
+        super(BlockingServer, self).__init__(port)
+
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+
+        self.bodies = list()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def _handle_request(self, request):
+        self.bodies.append(request.body)
+
+        self.started.set()
+        self.release.wait(5)
+
+
+class HttpServerTest(unittest.TestCase):
+    server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.release.set()
+            self.server.shutdown()
+
+    def start_server(self, keep_alive_timeout=5, **kwargs):
+        self.server = BlockingServer(free_port(), **kwargs)
+        self.server.keep_alive_timeout = keep_alive_timeout
+        self.server.start()
+
+        return self.server
+
+    def post(self, body='', connection=None):
+        connection = connection or http_client.HTTPConnection('localhost', self.server.port, timeout=5)
+        connection.request('POST', '/', body=body)
+
+        response = connection.getresponse()
+
+        return response.status, response.read().decode('utf-8').strip()
+
+    def test_keep_alive(self):
+        self.start_server()
+
+        connection = http_client.HTTPConnection('localhost', self.server.port, timeout=5)
+
+        self.assertEqual(self.post('first', connection), (200, 'OK'))
+
+        sock = connection.sock
+
+        self.assertEqual(self.post('second', connection), (200, 'OK'))
+
+        self.assertIs(connection.sock, sock)
+        self.assertEqual(self.server.bodies, [b'first', b'second'])
+
+        connection.close()
+
+    def test_idle_connections_do_not_hold_workers(self):
+        self.start_server(pool_size=1)
+
+        idle = [http_client.HTTPConnection('localhost', self.server.port, timeout=5) for _ in range(3)]
+
+        for connection in idle:
+            self.assertEqual(self.post('idle', connection), (200, 'OK'))
+
+        # the only worker thread is free while the connections above stay open
+        other = http_client.HTTPConnection('localhost', self.server.port, timeout=1)
+
+        self.assertEqual(self.post('other', other), (200, 'OK'))
+
+        for connection in idle:
+            self.assertEqual(self.post('again', connection), (200, 'OK'))
+            connection.close()
+
+        other.close()
+
+    def test_closes_idle_connections(self):
+        self.start_server(keep_alive_timeout=0.2)
+
+        connection = http_client.HTTPConnection('localhost', self.server.port, timeout=5)
+
+        self.assertEqual(self.post('first', connection), (200, 'OK'))
+
+        self.assertEqual(connection.sock.recv(1), six.b(''))
+
+        connection.close()
+
+    def test_concurrent_requests(self):
+        self.start_server()
+
+        self.server.release.clear()
+
+        slow = threading.Thread(target=self.post)
+        slow.start()
+
+        self.assertTrue(self.server.started.wait(5))
+
+        # a second connection is handled while the first one is blocked
+        other = http_client.HTTPConnection('localhost', self.server.port, timeout=1)
+        other.request('GET', '/')
+
+        self.assertEqual(other.getresponse().status, 501)
+
+        other.close()
+
+        self.server.release.set()
+        slow.join(5)
+
+    def test_rejects_when_queue_is_full(self):
+        self.start_server(pool_size=1, queue_size=1)
+
+        self.server.release.clear()
+
+        busy = threading.Thread(target=self.post)
+        busy.start()
+
+        self.assertTrue(self.server.started.wait(5))
+
+        queued = socket.create_connection(('localhost', self.server.port))
+
+        try:
+            for _ in range(20):
+                if not self.server._httpd.pending.empty():
+                    break
+
+                self.server.release.wait(0.05)
+
+            self.assertEqual(self.post()[0], 503)
+
+        finally:
+            queued.close()
+
+            self.server.release.set()
+            busy.join(5)
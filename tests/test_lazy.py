@@ -1,5 +1,8 @@
+import threading
+import time
 import unittest
 
+from templates import create_environment
 from utils import Lazy, EnhancedList, EnhancedDict
 
 
@@ -40,3 +43,82 @@ class LazyTest(unittest.TestCase):
 
         self.assertEqual(lazy.key, 'lazy')
 
+
+    def test_empty_values_are_cached(self):
+        calls = list()
+
+        lazy = Lazy(lambda: calls.append(1) or EnhancedList())
+
+        self.assertEqual(len(lazy), 0)
+        self.assertIsNone(lazy.first)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidate(self):
+        calls = list()
+
+        lazy = Lazy(lambda: calls.append(1) or len(calls))
+
+        self.assertEqual(str(lazy), '1')
+        self.assertEqual(str(lazy), '1')
+
+        lazy.invalidate()
+
+        self.assertEqual(str(lazy), '2')
+
+    def test_expire_after(self):
+        calls = list()
+
+        lazy = Lazy(lambda: calls.append(1) or len(calls)).expire_after(0.1)
+
+        self.assertEqual(str(lazy), '1')
+        self.assertEqual(str(lazy), '1')
+
+        time.sleep(0.15)
+
+        self.assertEqual(str(lazy), '2')
+
+    def test_evaluated_once_by_threads(self):
+        calls = list()
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return EnhancedList([1])
+
+        lazy = Lazy(slow)
+        threads = [threading.Thread(target=len, args=(lazy,)) for _ in range(5)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_truth_value(self):
+        self.assertFalse(Lazy(EnhancedList))
+        self.assertTrue(Lazy(EnhancedList, [1]))
+
+    def test_contains(self):
+        lazy = Lazy(EnhancedList, [1, 2])
+
+        self.assertIn(2, lazy)
+        self.assertNotIn(3, lazy)
+
+    def test_list_operations(self):
+        lazy = Lazy(EnhancedList, [1, 2])
+
+        self.assertEqual(lazy, [1, 2])
+        self.assertNotEqual(lazy, [])
+        self.assertEqual(lazy + [3], [1, 2, 3])
+        self.assertEqual([0] + lazy, [0, 1, 2])
+        self.assertEqual(lazy + Lazy(EnhancedList, [3]), [1, 2, 3])
+
+    def test_json(self):
+        environment = create_environment('#')[0]
+
+        template = environment.from_string('{{ items|tojson }} {{ (items + more)|tojson }}')
+
+        self.assertEqual(template.render(items=Lazy(EnhancedList, [1, 2]), more=Lazy(EnhancedList, [3])),
+                         '[1, 2] [1, 2, 3]')
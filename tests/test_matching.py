@@ -235,6 +235,64 @@ class MatchingTest(unittest.TestCase):
         self.assertEqual(len(items.matching('abc')), 1)
         self.assertIsInstance(items.matching('abc'), NetworkList)
 
+    def test_matching_order(self):
+        source = ContainerList([
+            ED(id='a2', name='x', labels={}),
+            ED(id='x1', name='other', labels={}),
+            ED(id='b3', labels={'com.docker.compose.service': 'x'}),
+            ED(id='c4', labels={'pygen.target': 'x'}),
+            ED(id='x2', name='x', labels={})
+        ])
+
+        self.assertEqual([c.id for c in source.matching('x')], ['a2', 'c4', 'x2', 'x1', 'b3'])
+
+    def test_match_any(self):
+        source = ContainerList([
+            ED(id='c1', name='proxy', labels={}),
+            ED(id='c2', name='web', labels={'com.docker.compose.service': 'app'}),
+            ED(id='c3', name='db', labels={}),
+            ED(id='c4', name='config-loader', labels={})
+        ])
+
+        self.assertEqual([c.name for c in source.matching_any(['config-loader', 'proxy', 'c1'])],
+                         ['config-loader', 'proxy'])
+        self.assertEqual([c.name for c in source.not_matching_any(['config-loader', 'proxy'])],
+                         ['web', 'db'])
+        self.assertEqual([c.name for c in source.not_matching_any(['app', 'c3', 'missing'])],
+                         ['proxy', 'config-loader'])
+        self.assertEqual([c.name for c in source.matching_any('db')], ['db'])
+        self.assertEqual(len(source.not_matching_any([])), 4)
+        self.assertIsInstance(source.not_matching_any(['db']), ContainerList)
+
+    def test_matching_index_invalidated_on_change(self):
+        source = ContainerList([ED(id='c1', name='first', labels={})])
+
+        self.assertEqual(len(source.matching('second')), 0)
+
+        source.append(ED(id='c2', name='second', labels={}))
+
+        self.assertEqual(len(source.matching('second')), 1)
+
+        source[0] = ED(id='c3', name='third', labels={})
+
+        self.assertEqual(len(source.matching('first')), 0)
+        self.assertEqual(len(source.matching('third')), 1)
+        self.assertEqual(len(source.matching('c')), 2)
+
+        source.remove(source.matching('second').first)
+
+        self.assertEqual(len(source.matching('second')), 0)
+        self.assertEqual(len(source.matching('c')), 1)
+
+        source.extend([ED(id='c4', name='fourth', labels={}), ED(id='c5', name='fifth', labels={})])
+        del source[0]
+
+        self.assertEqual([c.name for c in source.matching('c')], ['fourth', 'fifth'])
+
+        source.reverse()
+
+        self.assertEqual([c.name for c in source.matching('c')], ['fifth', 'fourth'])
+
     def test_match_self_container_id(self):
         with mock_container_id('abcd1234'):
             items = ContainerList([
@@ -1,4 +1,7 @@
 import os
+import shutil
+import tempfile
+import threading
 import unittest
 import docker_helper
 
@@ -62,6 +65,252 @@ class PyGenTest(unittest.TestCase):
 
         self.assertEqual('1mocked-12', app.generate())
 
+    def test_track_dependencies(self):
+        from resources import ContainerList
+        from utils import TrackedDict
+
+        directory = tempfile.mkdtemp()
+
+        try:
+            app = pygen.PyGen(template='#{% for c in containers %}{{ c.name }}{% endfor %}',
+                              target=os.path.join(directory, 'target'),
+                              track_dependencies=True, interval=[0])
+
+            state = {'name': 'first', 'image': 'one'}
+            rendered = list()
+
+            def mock_containers(*args, **kwargs):
+                return ContainerList([TrackedDict(id='c1', **state)])
+
+            app.api.containers = mock_containers
+            app.timer.function = lambda: None
+
+            generate = app.generate
+
+            def counting_generate(*args, **kwargs):
+                rendered.append(1)
+                return generate(*args, **kwargs)
+
+            app.generate = counting_generate
+
+            app.update_target()
+            self.assertEqual(len(rendered), 1)
+
+            state['image'] = 'two'
+
+            app.update_target()
+            self.assertEqual(len(rendered), 1)
+
+            state['name'] = 'second'
+
+            app.update_target()
+            self.assertEqual(len(rendered), 2)
+
+            with open(os.path.join(directory, 'target')) as target:
+                self.assertEqual(target.read(), 'second')
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_state_variables(self):
+        app = pygen.PyGen(template='#{% for c in containers %}{{ c.name }}{% endfor %}')
+
+        self.assertEqual(app.state_variables, {'containers'})
+        self.assertEqual(app.event_matcher.filters['type'], ['container'])
+
+        self.assertIn('containers', app._template_args())
+        self.assertNotIn('services', app._template_args())
+
+    def test_state_variables_of_multiple_outputs(self):
+        app = pygen.PyGen(template='#{{ containers|length }}',
+                          output=[['#{{ all_services|length }}', '/tmp/target']])
+
+        self.assertEqual(app.state_variables, {'containers', 'all_services'})
+        self.assertEqual(app.event_matcher.filters['type'], ['container', 'service'])
+
+    def test_check_templates(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            template_path = os.path.join(directory, 'template.j2')
+            target_path = os.path.join(directory, 'target')
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('first')
+
+            app = pygen.PyGen(template=template_path, target=target_path, interval=[0])
+            app.timer.function = lambda: None
+
+            app.update_target()
+            app.check_templates()
+
+            with open(target_path) as target:
+                self.assertEqual(target.read(), 'first')
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('second')
+
+            os.utime(template_path, (0, 0))
+
+            app.check_templates()
+
+            with open(target_path) as target:
+                self.assertEqual(target.read(), 'second')
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_check_templates_waits_for_updates(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            template_path = os.path.join(directory, 'template.j2')
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('first')
+
+            app = pygen.PyGen(template=template_path, interval=[0])
+            app.timer.function = lambda: None
+
+            template = app.primary_target.template
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('second')
+
+            os.utime(template_path, (0, 0))
+
+            checker = threading.Thread(target=app.check_templates)
+
+            with app.update_lock:
+                checker.start()
+                checker.join(0.2)
+
+                self.assertIs(app.primary_target.template, template)
+
+            checker.join(5)
+
+            self.assertIsNot(app.primary_target.template, template)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reload_templates_waits_for_updates(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            template_path = os.path.join(directory, 'template.j2')
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('first')
+
+            app = pygen.PyGen(template=template_path, interval=[0])
+            app.timer.function = lambda: None
+
+            template = app.primary_target.template
+
+            with open(template_path, 'w') as template_file:
+                template_file.write('second')
+
+            os.utime(template_path, (0, 0))
+
+            reloader = threading.Thread(target=app.reload_templates, args=({template_path},))
+
+            with app.update_lock:
+                reloader.start()
+                reloader.join(0.2)
+
+                self.assertIs(app.primary_target.template, template)
+
+            reloader.join(5)
+
+            self.assertIsNot(app.primary_target.template, template)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reload_templates(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            def write(name, content):
+                with open(os.path.join(directory, name), 'w') as template_file:
+                    template_file.write(content)
+
+            write('first.j2', 'first:{% for c in containers %}{{ c.name }}{% endfor %}')
+            write('second.j2', 'second:{% include "item.j2" %}')
+            write('item.j2', 'item')
+
+            app = pygen.PyGen(template=os.path.join(directory, 'first.j2'),
+                              target=os.path.join(directory, 'first'),
+                              output=[[os.path.join(directory, 'second.j2'), os.path.join(directory, 'second')]],
+                              interval=[0])
+
+            calls = list()
+            containers = app.api.containers
+
+            def mock_containers(*args, **kwargs):
+                calls.append(1)
+                return containers(*args, **kwargs)
+
+            app.api.containers = mock_containers
+
+            for target in app.targets:
+                target.timer.function = lambda: None
+
+            app.update_target()
+
+            self.assertEqual(len(calls), 1)
+
+            write('item.j2', 'changed')
+            os.utime(os.path.join(directory, 'item.j2'), (0, 0))
+            write('first.j2', 'first:changed')
+            os.utime(os.path.join(directory, 'first.j2'), (0, 0))
+
+            app.reload_templates({os.path.join(directory, 'item.j2')})
+
+            with open(os.path.join(directory, 'first')) as target:
+                self.assertEqual(target.read(), 'first:one')
+
+            with open(os.path.join(directory, 'second')) as target:
+                self.assertEqual(target.read(), 'second:changed')
+
+            app.reload_templates({os.path.join(directory, 'first.j2')})
+
+            with open(os.path.join(directory, 'first')) as target:
+                self.assertEqual(target.read(), 'first:changed')
+
+            self.assertEqual(len(calls), 1)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_request_update(self):
+        app = pygen.PyGen(template='#')
+
+        updates = list()
+        app.update_target = lambda allow_repeat=False: updates.append(allow_repeat)
+
+        app.request_update('test', allow_repeat=True)
+
+        # updates immediately when the render worker is not running
+        self.assertEqual(updates, [True])
+
+    def test_request_update_with_render_queue(self):
+        app = pygen.PyGen(template='#')
+
+        updated = threading.Event()
+
+        app.render_queue.update_function = lambda allow_repeat=False: updated.set()
+        app.render_queue.start()
+
+        try:
+            app.request_update('test')
+
+            self.assertTrue(updated.wait(5))
+
+        finally:
+            app.render_queue.stop()
+
     def test_read_config(self):
         app = pygen.PyGen(template='#c1={{ read_config("PYGEN_TEST_KEY") }} '
                                    'c2={{ read_config("PYGEN_CONF", "/tmp/pygen-conf-test") }} '
@@ -102,3 +351,69 @@ class PyGenTest(unittest.TestCase):
         self.assertEqual(app.timer.min_interval, 12)
         self.assertEqual(app.timer.max_interval, 40)
 
+
+    def test_multiple_outputs(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            app = pygen.PyGen(template='#primary', target=os.path.join(directory, 'primary'),
+                              signal=[('primary-target', 'HUP')],
+                              output=[['#second', os.path.join(directory, 'second'),
+                                       'restart=second-target', 'signal=second-target:USR1']],
+                              interval=[0])
+
+            self.assertEqual(len(app.targets), 2)
+            self.assertEqual(app.targets[1].restart_targets, ['second-target'])
+            self.assertEqual(app.targets[1].signal_targets, [('second-target', 'USR1')])
+
+            signalled = list()
+
+            app.signal = lambda target: signalled.append(target.path)
+
+            for target in app.targets:
+                target.timer.function = lambda t=target: app.signal(t)
+
+            app.update_target()
+
+            with open(os.path.join(directory, 'primary')) as primary:
+                self.assertEqual(primary.read(), 'primary')
+
+            with open(os.path.join(directory, 'second')) as second:
+                self.assertEqual(second.read(), 'second')
+
+            self.assertEqual(signalled, [os.path.join(directory, 'primary'), os.path.join(directory, 'second')])
+
+            app.update_target()
+
+            self.assertEqual(len(signalled), 2)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_failing_output_still_signals_updated_targets(self):
+        directory = tempfile.mkdtemp()
+
+        try:
+            app = pygen.PyGen(template='#primary', target=os.path.join(directory, 'primary'),
+                              output=[['#{{ missing.attribute }}', os.path.join(directory, 'second')]],
+                              interval=[0])
+
+            signalled = list()
+
+            for target in app.targets:
+                target.timer.function = lambda t=target: signalled.append(t.path)
+
+            app.update_target()
+
+            with open(os.path.join(directory, 'primary')) as primary:
+                self.assertEqual(primary.read(), 'primary')
+
+            self.assertEqual(signalled, [os.path.join(directory, 'primary')])
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_invalid_outputs(self):
+        self.assertRaises(pygen.PyGenException, pygen.PyGen, template='#', output=[['#only-template']])
+        self.assertRaises(pygen.PyGenException, pygen.PyGen, template='#', output=[['#', '/tmp/x', 'reload=x']])
+        self.assertRaises(pygen.PyGenException, pygen.PyGen, template='#', output=[['#', '/tmp/x', 'signal=x']])
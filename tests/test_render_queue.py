@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+
+from render_queue import RenderQueue
+
+
+class RenderQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.updates = list()
+        self.updated = threading.Event()
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+
+        self.queue = RenderQueue(self.update)
+
+    def tearDown(self):
+        self.release.set()
+        self.queue.stop()
+
+    def update(self, allow_repeat=False):
+        self.updates.append(allow_repeat)
+
+        self.blocked.set()
+        self.release.wait(5)
+
+        self.updated.set()
+
+    def test_single_request(self):
+        self.release.set()
+        self.queue.start()
+
+        self.queue.request('test')
+
+        self.assertTrue(self.updated.wait(5))
+        self.assertEqual(self.updates, [False])
+
+    def test_coalesces_pending_requests(self):
+        self.queue.start()
+
+        self.queue.request('test')
+        self.assertTrue(self.blocked.wait(5))
+
+        # these arrive while the first update is running
+        for _ in range(10):
+            self.queue.request('test')
+
+        self.queue.request('test', allow_repeat=True)
+
+        self.release.set()
+
+        for _ in range(50):
+            if len(self.updates) > 1:
+                break
+
+            time.sleep(0.1)
+
+        self.queue.stop()
+        self.queue._thread.join(5)
+
+        self.assertEqual(self.updates, [False, True])
+
+    def test_start_once(self):
+        self.queue.start()
+        thread = self.queue._thread
+
+        self.queue.start()
+
+        self.assertIs(self.queue._thread, thread)
+        self.assertTrue(self.queue.is_running)
+
+    def test_stop(self):
+        self.queue.start()
+        self.queue.stop()
+
+        self.queue._thread.join(5)
+
+        self.assertFalse(self.queue.is_running)
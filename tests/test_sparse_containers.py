@@ -0,0 +1,125 @@
+import unittest
+
+import jinja2
+
+from compact import CompactContainerInfo
+from fakes import FakeContainer
+from models import ContainerInfo
+from resources import ContainerList
+from utils import DependencyTracker
+
+
+class SparseContainerTest(unittest.TestCase):
+    def setUp(self):
+        self.inspected = list()
+
+    def inspect(self, container_id):
+        self.inspected.append(container_id)
+        return FakeContainer(container_id, 'web', env=['PYGEN_TARGET=backend', 'PORT=8080'], image='nginx')
+
+    @staticmethod
+    def summary(container_id='c0123456789abcdef', name='web', status='Up 2 minutes', labels=None, image='nginx'):
+        return {
+            'Id': container_id,
+            'Names': ['/%s' % name],
+            'Image': image,
+            'ImageID': 'sha256:0123456789abcdef',
+            'Labels': labels or {'pygen.target': 'web-target'},
+            'State': 'running',
+            'Status': status,
+            'NetworkSettings': {'Networks': {'default': {'NetworkID': 'n1', 'IPAddress': '10.0.0.2'}}},
+            'Ports': [{'PrivatePort': 80, 'Type': 'tcp', 'PublicPort': 8080, 'IP': '0.0.0.0'},
+                      {'PrivatePort': 80, 'Type': 'tcp', 'PublicPort': 8080, 'IP': '::'},
+                      {'PrivatePort': 53, 'Type': 'udp'}]
+        }
+
+    def test_summary_fields(self):
+        container = ContainerInfo.from_summary(self.summary(), self.inspect)
+
+        self.assertEqual(container.id, 'c0123456789abcdef')
+        self.assertEqual(container.short_id, 'c0123456789a')
+        self.assertEqual(container.name, 'web')
+        self.assertEqual(container.image, 'nginx')
+        self.assertEqual(container.status, 'running')
+        self.assertEqual(container.health, 'unknown')
+        self.assertEqual(container.labels['pygen.target'], 'web-target')
+        self.assertEqual(container.networks.first.ip_address, '10.0.0.2')
+        self.assertEqual(container.ports.tcp, [80])
+        self.assertEqual(container.ports.udp, [53])
+
+        self.assertEqual(self.inspected, [])
+
+    def test_health_from_status(self):
+        for status, health in (('Up 2 minutes (healthy)', 'healthy'),
+                               ('Up 5 seconds (health: starting)', 'starting'),
+                               ('Up 1 hour (unhealthy)', 'unhealthy'),
+                               ('Up 1 hour', 'unknown')):
+            container = ContainerInfo.from_summary(self.summary(status=status), self.inspect)
+
+            self.assertEqual(container.health, health)
+
+    def test_inspect_on_demand(self):
+        container = ContainerInfo.from_summary(self.summary(), self.inspect)
+
+        self.assertIn('env', container)
+        self.assertEqual(self.inspected, [])
+
+        self.assertEqual(container.env.port, '8080')
+        self.assertEqual(container.raw.id, 'c0123456789abcdef')
+        self.assertEqual(container['env']['PORT'], '8080')
+
+        self.assertEqual(self.inspected, ['c0123456789abcdef'])
+
+    def test_template_without_inspect(self):
+        template = jinja2.Template('{% for c in containers %}{{ c.name }}:{{ c.labels["pygen.target"] }} {% endfor %}')
+
+        containers = ContainerList(ContainerInfo.from_summary(self.summary('c%d' % idx, 'web-%d' % idx), self.inspect)
+                                   for idx in range(3))
+
+        tracker = DependencyTracker()
+
+        with tracker:
+            content = template.render(containers=containers)
+
+        self.assertEqual(content, 'web-0:web-target web-1:web-target web-2:web-target ')
+        self.assertEqual(self.inspected, [])
+
+    def test_image_after_the_tag_moved(self):
+        container = ContainerInfo.from_summary(self.summary(image='sha256:0123456789abcdef'), self.inspect)
+
+        self.assertIn('image', container)
+        self.assertEqual(self.inspected, [])
+
+        self.assertEqual(container.image, 'nginx')
+        self.assertEqual(self.inspected, ['c0123456789abcdef'])
+
+        compact = CompactContainerInfo.from_summary(self.summary(image='sha256:0123456789abcdef'), self.inspect)
+
+        self.assertEqual(compact.image, 'nginx')
+
+    def test_matching_environment_variable(self):
+        containers = ContainerList([ContainerInfo.from_summary(self.summary(), self.inspect)])
+
+        self.assertEqual(len(containers.matching('backend')), 1)
+        self.assertEqual(self.inspected, ['c0123456789abcdef'])
+
+    def test_matching_by_name_and_environment_variable(self):
+        containers = ContainerList([ContainerInfo.from_summary(self.summary('c1', 'backend'), self.inspect),
+                                    ContainerInfo.from_summary(self.summary('c2', 'web'), self.inspect)])
+
+        self.assertEqual(self.inspected, [])
+
+        self.assertEqual([c.id for c in containers.matching('backend')], ['c1', 'c2'])
+        self.assertEqual(len(containers.not_matching('backend')), 0)
+        self.assertEqual(self.inspected, ['c1', 'c2'])
+
+    def test_compact_summary(self):
+        container = CompactContainerInfo.from_summary(self.summary(), self.inspect)
+
+        self.assertEqual(container.name, 'web')
+        self.assertEqual(container.ports.tcp, [80])
+        self.assertEqual(self.inspected, [])
+
+        self.assertEqual(container.env.port, '8080')
+        self.assertEqual(container.env.pygen_target, 'backend')
+        self.assertEqual(self.inspected, ['c0123456789abcdef'])
@@ -0,0 +1,131 @@
+import unittest
+
+from docker.errors import NotFound
+
+from api import StateCache
+from fakes import FakeContainer, Namespace
+from models import ContainerInfo
+from resources import ContainerList, ServiceList
+
+
+class FakeApi(object):
+    container_model = ContainerInfo
+
+    def __init__(self):
+        self.running = dict()
+        self.list_calls = 0
+        self.get_calls = 0
+
+        api = self
+
+        def get_container(container_id):
+            api.get_calls += 1
+
+            if container_id not in self.running:
+                raise NotFound('not found')
+
+            return self.running[container_id]
+
+        self.client = Namespace(
+            containers=Namespace(get=get_container),
+            api=Namespace(containers=lambda quiet: [{'Id': c} for c in self.running
+                                                    if self.running[c].attrs['State']['Running']])
+        )
+
+    @property
+    def is_swarm_mode(self):
+        return False
+
+    def add(self, container_id, running=True, **kwargs):
+        self.running[container_id] = FakeContainer(container_id, running=running, **kwargs)
+
+    def containers(self):
+        self.list_calls += 1
+        return ContainerList(ContainerInfo(c) for c in self.running.values() if c.attrs['State']['Running'])
+
+    def services(self):
+        return ServiceList()
+
+
+class StateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeApi()
+        self.cache = StateCache(self.api, resync_interval=0)
+
+    def test_seeds_once(self):
+        self.api.add('c001')
+        self.api.add('c002')
+
+        self.assertEqual(len(self.cache.containers()), 2)
+        self.assertEqual(len(self.cache.containers()), 2)
+        self.assertEqual(self.api.list_calls, 1)
+
+    def test_applies_container_events(self):
+        self.api.add('c001')
+
+        self.assertEqual(len(self.cache.containers()), 1)
+
+        self.api.add('c002')
+        self.cache.apply({'Type': 'container', 'Action': 'start', 'Actor': {'ID': 'c002'}})
+
+        self.assertEqual(sorted(c.id for c in self.cache.containers()), ['c001', 'c002'])
+
+        self.api.add('c001', running=False)
+        self.cache.apply({'Type': 'container', 'Action': 'die', 'Actor': {'ID': 'c001'}})
+
+        self.assertEqual([c.id for c in self.cache.containers()], ['c002'])
+
+        del self.api.running['c002']
+        self.cache.apply({'Type': 'container', 'Action': 'destroy', 'Actor': {'ID': 'c002'}})
+
+        self.assertEqual(len(self.cache.containers()), 0)
+        self.assertEqual(self.api.list_calls, 1)
+        self.assertEqual(self.api.get_calls, 3)
+
+    def test_health_status_event(self):
+        self.api.add('c001')
+        self.cache.containers()
+
+        self.cache.apply({'Type': 'container', 'Action': 'health_status: healthy', 'Actor': {'ID': 'c001'}})
+
+        self.assertEqual(self.api.get_calls, 1)
+
+    def test_ignores_irrelevant_events(self):
+        self.api.add('c001')
+        self.cache.containers()
+
+        self.cache.apply({'Type': 'container', 'Action': 'exec_start: sh', 'Actor': {'ID': 'c001'}})
+        self.cache.apply({'Type': 'network', 'Action': 'connect', 'Actor': {'ID': 'n001'}})
+
+        self.assertEqual(self.api.get_calls, 0)
+
+    def test_invalidate(self):
+        self.api.add('c001')
+        self.cache.containers()
+
+        self.cache.invalidate()
+        self.cache.containers()
+
+        self.assertEqual(self.api.list_calls, 2)
+
+    def test_rebuilds_on_drift(self):
+        self.cache.resync_interval = 0.000001
+
+        self.api.add('c001')
+        self.assertEqual(len(self.cache.containers()), 1)
+
+        # no event received for the new container
+        self.api.add('c002')
+
+        self.assertEqual(len(self.cache.containers()), 2)
+        self.assertEqual(self.api.list_calls, 2)
+
+    def test_extends_event_filters(self):
+        filters = self.cache.event_filters({'event': ['start'], 'type': ['container'], 'label': ['pygen.watch']})
+
+        self.assertIn('start', filters['event'])
+        self.assertIn('die', filters['event'])
+        self.assertIn('destroy', filters['event'])
+        self.assertEqual(filters['event'].count('start'), 1)
+        self.assertEqual(filters['type'], ['container', 'service'])
+        self.assertNotIn('label', filters)
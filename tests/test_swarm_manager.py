@@ -1,3 +1,4 @@
+import time
 import unittest
 
 import actions
@@ -128,3 +129,21 @@ class SwarmManagerTest(unittest.TestCase):
 
         self.assertEqual(sum(num_updates), 3)
 
+
+    def test_worker_retries(self):
+        self.worker.retries = 2
+        self.worker.retry_delay = 0.1
+
+        calls = list()
+
+        def mock_update_request(manager, port):
+            calls.append((manager, time.time()))
+            return 503, ''
+
+        self.patch(self.worker, '_send_update_request', mock_update_request)
+
+        self.worker.send_update('start')
+
+        self.assertEqual([manager for manager, _ in calls], ['localhost'] * 3)
+        self.assertGreaterEqual(calls[1][1] - calls[0][1], 0.1)
+        self.assertGreaterEqual(calls[2][1] - calls[1][1], 0.2)
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from targets import TargetFile
+
+
+class TargetFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'target.conf')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_contents(self):
+        with open(self.path, 'r') as target:
+            return target.read()
+
+    def test_writes_new_file(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update('first'))
+        self.assertEqual(self.read_contents(), 'first')
+
+        self.assertTrue(target.update('second'))
+        self.assertEqual(self.read_contents(), 'second')
+
+    def test_skips_unchanged_content_without_reading(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update('content'))
+
+        original_open = open
+        reads = list()
+
+        def counting_open(path, mode='r', *args, **kwargs):
+            if 'r' in mode:
+                reads.append(path)
+
+            return original_open(path, mode, *args, **kwargs)
+
+        import targets
+
+        targets.open = counting_open
+
+        try:
+            self.assertFalse(target.update('content'))
+            self.assertFalse(target.update('content'))
+
+        finally:
+            del targets.open
+
+        self.assertEqual(reads, [])
+
+    def test_writes_changed_content_without_reading(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update('first'))
+
+        def failing_digest():
+            self.fail('The target file should not be read')
+
+        target._file_digest = failing_digest
+
+        self.assertTrue(target.update('second'))
+        self.assertEqual(self.read_contents(), 'second')
+
+    def test_detects_outside_changes(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update('content'))
+
+        with open(self.path, 'w') as outside:
+            outside.write('changed outside and longer')
+
+        self.assertTrue(target.update('content'))
+        self.assertEqual(self.read_contents(), 'content')
+
+    def test_detects_removed_file(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update('content'))
+
+        os.remove(self.path)
+
+        self.assertTrue(target.update('content'))
+        self.assertEqual(self.read_contents(), 'content')
+
+    def test_existing_file_with_same_content(self):
+        with open(self.path, 'w') as existing:
+            existing.write('content')
+
+        target = TargetFile(self.path)
+
+        self.assertFalse(target.update('content'))
+        self.assertTrue(target.update('new content'))
+
+    def test_atomic_write(self):
+        with open(self.path, 'w') as existing:
+            existing.write('existing')
+
+        os.chmod(self.path, 0o640)
+
+        original_inode = os.stat(self.path).st_ino
+
+        target = TargetFile(self.path, atomic=True, fsync=True)
+
+        self.assertTrue(target.update('atomic'))
+        self.assertEqual(self.read_contents(), 'atomic')
+        self.assertNotEqual(os.stat(self.path).st_ino, original_inode)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.directory), ['target.conf'])
+
+        self.assertFalse(target.update('atomic'))
+
+    def test_atomic_write_new_file(self):
+        target = TargetFile(self.path, atomic=True)
+
+        self.assertTrue(target.update('new'))
+        self.assertEqual(self.read_contents(), 'new')
+        self.assertEqual(os.listdir(self.directory), ['target.conf'])
+
+    def test_fsync_in_place(self):
+        target = TargetFile(self.path, fsync=True)
+
+        self.assertTrue(target.update('synced'))
+        self.assertEqual(self.read_contents(), 'synced')
+
+    def test_update_stream(self):
+        target = TargetFile(self.path)
+
+        self.assertTrue(target.update_stream(iter(['first', ' ', 'chunk'])))
+        self.assertEqual(self.read_contents(), 'first chunk')
+
+        self.assertFalse(target.update_stream(iter(['first chunk'])))
+        self.assertFalse(target.update('first chunk'))
+
+        self.assertTrue(target.update_stream(iter(['second', ' ', 'chunk'])))
+        self.assertEqual(self.read_contents(), 'second chunk')
+        self.assertEqual(os.listdir(self.directory), ['target.conf'])
+
+    def test_update_stream_with_existing_file(self):
+        with open(self.path, 'w') as existing:
+            existing.write('existing')
+
+        target = TargetFile(self.path)
+
+        self.assertFalse(target.update_stream(iter(['exist', 'ing'])))
+        self.assertEqual(os.listdir(self.directory), ['target.conf'])
+
+    def test_update_stream_failure(self):
+        target = TargetFile(self.path)
+
+        def failing_chunks():
+            yield 'partial'
+            raise ValueError('failed to render')
+
+        self.assertRaises(ValueError, target.update_stream, failing_chunks())
+        self.assertEqual(os.listdir(self.directory), [])
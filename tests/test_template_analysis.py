@@ -0,0 +1,58 @@
+import unittest
+
+import jinja2
+
+from templates import initialize_template, find_state_variables
+
+
+class TemplateAnalysisTest(unittest.TestCase):
+    @staticmethod
+    def environment(**templates):
+        return jinja2.Environment(loader=jinja2.DictLoader(templates))
+
+    def test_inline_template(self):
+        template = initialize_template('#{% for c in containers %}{{ c.name }} {{ own_container_id }}{% endfor %}')
+
+        self.assertEqual(find_state_variables(template), {'containers'})
+
+    def test_static_template(self):
+        template = initialize_template('#static content')
+
+        self.assertEqual(find_state_variables(template), set())
+
+    def test_all_state_variables(self):
+        template = initialize_template('#{{ containers }}{{ services }}{{ all_containers }}'
+                                       '{{ all_services }}{{ nodes }}')
+
+        self.assertEqual(find_state_variables(template),
+                         {'containers', 'services', 'all_containers', 'all_services', 'nodes'})
+
+    def test_local_variables_are_ignored(self):
+        template = initialize_template('#{% set services = containers %}{{ services|length }}'
+                                       '{% for nodes in all_containers %}{{ nodes }}{% endfor %}')
+
+        self.assertEqual(find_state_variables(template), {'containers', 'all_containers'})
+
+    def test_referenced_templates(self):
+        environment = self.environment(
+            main='{% include "services.j2" %}{% import "macros.j2" as m %}{{ m.render(containers) }}',
+            **{
+                'services.j2': '{% for s in services %}{{ s.name }}{% endfor %}',
+                'macros.j2': '{% macro render(items) %}{{ nodes }}{% endmacro %}'
+            }
+        )
+
+        self.assertEqual(find_state_variables(environment.get_template('main')), {'containers', 'services', 'nodes'})
+
+    def test_dynamic_includes(self):
+        environment = self.environment(main='{% include name %}{{ containers }}')
+
+        self.assertIsNone(find_state_variables(environment.get_template('main')))
+
+    def test_missing_includes(self):
+        environment = self.environment(main='{% include "missing.j2" %}{{ containers }}')
+
+        self.assertIsNone(find_state_variables(environment.get_template('main')))
+
+    def test_templates_without_loader(self):
+        self.assertIsNone(find_state_variables(jinja2.Template('{{ containers }}')))
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from templates import initialize_template, precompile_templates
+
+
+class TemplateCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        self.templates = os.path.join(self.directory, 'templates')
+        os.mkdir(self.templates)
+
+        self.write('main.j2', '{% include "item.j2" %} {{ name }}')
+        self.write('item.j2', 'item')
+        self.write('unrelated.txt', '{% invalid %}')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        with open(os.path.join(self.templates, name), 'w') as template_file:
+            template_file.write(content)
+
+    def test_bytecode_cache(self):
+        cache = os.path.join(self.directory, 'cache')
+
+        template = initialize_template(os.path.join(self.templates, 'main.j2'), bytecode_cache=cache)
+
+        self.assertEqual(template.render(name='first'), 'item first')
+        self.assertEqual(len(os.listdir(cache)), 2)
+
+        template = initialize_template(os.path.join(self.templates, 'main.j2'), bytecode_cache=cache)
+
+        self.assertEqual(template.render(name='second'), 'item second')
+        self.assertEqual(len(os.listdir(cache)), 2)
+
+    def test_bytecode_cache_of_inline_templates(self):
+        cache = os.path.join(self.directory, 'cache')
+
+        self.assertEqual(initialize_template('#{{ 1 + 2 }}', bytecode_cache=cache).render(), '3')
+        self.assertEqual(initialize_template('#{{ 2 + 2 }}', bytecode_cache=cache).render(), '4')
+
+    def test_precompile(self):
+        compiled = os.path.join(self.directory, 'compiled')
+
+        precompile_templates(compiled, os.path.join(self.templates, 'main.j2'), '#inline is skipped')
+
+        self.assertEqual(len(os.listdir(compiled)), 2)
+
+        # the precompiled version is used even when the source changes
+        self.write('main.j2', 'changed')
+
+        template = initialize_template(os.path.join(self.templates, 'main.j2'), precompiled=compiled)
+
+        self.assertEqual(template.render(name='compiled'), 'item compiled')
+
+        template = initialize_template(os.path.join(self.templates, 'item.j2'), precompiled=compiled)
+
+        self.assertEqual(template.render(), 'item')
+
+    def test_precompiled_fallback(self):
+        compiled = os.path.join(self.directory, 'compiled')
+        os.mkdir(compiled)
+
+        template = initialize_template(os.path.join(self.templates, 'main.j2'), precompiled=compiled)
+
+        self.assertEqual(template.render(name='source'), 'item source')
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from template_watcher import TemplateWatcher
+from templates import initialize_template, find_template_files
+
+
+class TemplateWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.changes = list()
+        self.changed = threading.Event()
+
+        self.write('main.j2', '{% include "item.j2" %}')
+        self.write('item.j2', 'item')
+        self.write('other.j2', 'other')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, content):
+        with open(self.path(name), 'w') as template_file:
+            template_file.write(content)
+
+    def on_change(self, paths):
+        self.changes.append(paths)
+        self.changed.set()
+
+    def verify_watcher(self, watcher):
+        watcher.watch([self.path('main.j2'), self.path('item.j2')])
+        watcher.start()
+
+        try:
+            time.sleep(0.1)
+
+            self.write('other.j2', 'changed')
+
+            self.assertFalse(self.changed.wait(0.5))
+
+            self.write('item.j2', 'changed')
+
+            self.assertTrue(self.changed.wait(2))
+            self.assertEqual(self.changes, [{self.path('item.j2')}])
+
+        finally:
+            watcher.stop()
+
+    def test_inotify(self):
+        watcher = TemplateWatcher(self.on_change, poll_interval=0.1)
+
+        self.verify_watcher(watcher)
+
+        self.assertIsNotNone(watcher._inotify)
+
+    def test_polling(self):
+        watcher = TemplateWatcher(self.on_change, poll_interval=0.1, use_inotify=False)
+
+        self.verify_watcher(watcher)
+
+    def test_watch_directories(self):
+        watcher = TemplateWatcher(self.on_change)
+        watcher.watch([], [self.directory])
+
+        self.assertTrue(watcher.is_watched(self.path('anything.j2')))
+        self.assertFalse(watcher.is_watched(os.path.join(self.directory, 'sub', 'anything.j2')))
+
+    def test_find_template_files(self):
+        template = initialize_template(self.path('main.j2'))
+
+        self.assertEqual(find_template_files(template), ({self.path('main.j2'), self.path('item.j2')}, set()))
+
+        self.write('dynamic.j2', '{% include name %}')
+
+        template = initialize_template(self.path('dynamic.j2'))
+
+        self.assertEqual(find_template_files(template), (set(), {os.path.abspath(self.directory)}))
+
+        self.assertIsNone(find_template_files(initialize_template('#inline')))
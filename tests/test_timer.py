@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+
+from timer import NotificationTimer, Scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+
+    def test_runs_calls_in_order(self):
+        calls = list()
+        done = threading.Event()
+
+        self.scheduler.call_later(0.2, lambda: (calls.append('last'), done.set()))
+        self.scheduler.call_later(0.1, lambda: calls.append('second'))
+        self.scheduler.call_later(0, lambda: calls.append('first'))
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(calls, ['first', 'second', 'last'])
+
+    def test_cancel(self):
+        calls = list()
+        done = threading.Event()
+
+        call = self.scheduler.call_later(0.05, lambda: calls.append('cancelled'))
+        self.scheduler.call_later(0.1, done.set)
+
+        call.cancel()
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(calls, [])
+
+    def test_survives_errors(self):
+        done = threading.Event()
+
+        def failing():
+            raise Exception('failed')
+
+        self.scheduler.call_later(0, failing)
+        self.scheduler.call_later(0.05, done.set)
+
+        self.assertTrue(done.wait(5))
+
+    def test_slow_calls_do_not_block(self):
+        release = threading.Event()
+        done = threading.Event()
+
+        self.scheduler.call_later(0, lambda: release.wait(5))
+        self.scheduler.call_later(0.05, done.set)
+
+        try:
+            self.assertTrue(done.wait(1))
+
+        finally:
+            release.set()
+
+    def test_single_thread(self):
+        for _ in range(100):
+            self.scheduler.call_later(10, lambda: None).cancel()
+
+        self.assertEqual(len([t for t in threading.enumerate() if t is self.scheduler._thread]), 1)
+
+
+class NotificationTimerTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = list()
+        self.scheduler = Scheduler()
+
+    def notify(self):
+        self.calls.append(time.time())
+
+    def test_immediate(self):
+        timer = NotificationTimer(self.notify, 0, 0, scheduler=self.scheduler)
+        timer.schedule()
+
+        self.assertEqual(len(self.calls), 1)
+
+    def test_batches_notifications(self):
+        timer = NotificationTimer(self.notify, 0.2, 1, scheduler=self.scheduler)
+
+        for _ in range(5):
+            timer.schedule()
+            time.sleep(0.05)
+
+        time.sleep(0.5)
+
+        self.assertEqual(len(self.calls), 1)
+
+    def test_maximum_interval(self):
+        timer = NotificationTimer(self.notify, 0.2, 0.4, scheduler=self.scheduler)
+
+        started = time.time()
+
+        # keeps rescheduling before the minimum interval passes
+        while time.time() - started < 0.7:
+            timer.schedule()
+            time.sleep(0.05)
+
+        time.sleep(0.3)
+
+        self.assertGreaterEqual(len(self.calls), 1)
+        self.assertLess(self.calls[0] - started, 0.6)
+
+    def test_cancel(self):
+        timer = NotificationTimer(self.notify, 0.1, 0.1, scheduler=self.scheduler)
+        timer.schedule()
+        timer.cancel()
+
+        time.sleep(0.3)
+
+        self.assertEqual(self.calls, [])
+
+    def test_replaced_function(self):
+        timer = NotificationTimer(self.notify, 0.05, 0.05, scheduler=self.scheduler)
+        timer.schedule()
+
+        done = threading.Event()
+        timer.function = done.set
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.calls, [])